@@ -1,19 +1,38 @@
 # alert_engine.py
 import json
 from opensearchpy import OpenSearch, RequestsHttpConnection
+import argparse
+import signal
+import threading
 import time
+import os
 from datetime import datetime
 
+from backend.app.processor.ruleset import get_ruleset
+
 OPENSEARCH_HOST = "localhost"
 OPENSEARCH_PORT = 9200
 ADMIN_USER = "admin"
 ADMIN_PASS = "ChangeMeAdmin123!"
 
 INDEX_NAME = "summarized_documents"
-ALERT_KEYWORDS = ["risk", "hazard", "danger", "urgent", "shutdown", "delayed", "threaten", "incident"]
-DEPARTMENTS_FILE = "departments.json"
 OUTPUT_ALERT_FOLDER = "outgoing_alerts"  # simulates sending alerts (store JSONs here)
 
+# Position of the last routed hit, so each run only pages through new matches
+WATERMARK_FILE = os.getenv("ALERT_WATERMARK_FILE", "alert_pipeline_state.json")
+BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 100))
+POLL_INTERVAL = float(os.getenv("ALERT_POLL_INTERVAL", 30))
+# Hits are read in the order they were indexed; ingest.py writes both fields,
+# and the keyword doc_uid breaks ties without needing _id fielddata
+SORT_ORDER = [
+    {"indexed_at": {"order": "asc", "unmapped_type": "date"}},
+    {"doc_uid": {"order": "asc", "unmapped_type": "keyword"}}
+]
+SORT_FIELDS = [next(iter(field)) for field in SORT_ORDER]
+# Documents indexed in the last few seconds may not be searchable yet; leave them for
+# the next poll so a late refresh cannot put them behind the watermark
+SETTLE_SECONDS = int(os.getenv("ALERT_SETTLE_SECONDS", 5))
+
 # Connect client
 client = OpenSearch(
     hosts=[{"host": OPENSEARCH_HOST, "port": OPENSEARCH_PORT}],
@@ -23,57 +42,149 @@ client = OpenSearch(
     connection_class=RequestsHttpConnection,
 )
 
-# Load departments
-with open(DEPARTMENTS_FILE, "r", encoding="utf-8") as f:
-    departments = json.load(f)
-
 # Ensure output folder exists
-import os
 os.makedirs(OUTPUT_ALERT_FOLDER, exist_ok=True)
 
-def find_alerts():
+def load_watermark(path=WATERMARK_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    # A watermark saved under another sort order does not compare with these sort values
+    if state.get("sort") != SORT_FIELDS:
+        return None
+    return state.get("search_after")
+
+def save_watermark(search_after, path=WATERMARK_FILE):
+    # Write then rename, so a crash never leaves a half-written watermark behind
+    partial_path = path + ".tmp"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump({"search_after": search_after, "sort": SORT_FIELDS, "updated_at": datetime.utcnow().isoformat() + "Z"}, f)
+    os.replace(partial_path, path)
+
+def find_alerts(search_after=None, size=BATCH_SIZE):
     # Search for docs containing alert keywords in the summary.
-    # We'll do a simple match query with OR on keywords.
-    query_string = " OR ".join(ALERT_KEYWORDS)
+    # We'll do a simple match query with OR on the ruleset's alert keywords.
+    query_string = " OR ".join(get_ruleset().alert_keywords)
     body = {
         "query": {
-            "simple_query_string": {
-                "query": query_string,
-                "fields": ["summary"],
-                "default_operator": "and"
+            "bool": {
+                "must": {
+                    "simple_query_string": {
+                        "query": query_string,
+                        "fields": ["summary"],
+                        "default_operator": "and"
+                    }
+                },
+                # Also skips documents without an indexing time, which would sort after every watermark
+                "filter": {"range": {"indexed_at": {"lte": f"now-{SETTLE_SECONDS}s"}}}
             }
-        }
+        },
+        "sort": SORT_ORDER
     }
-    res = client.search(index=INDEX_NAME, body=body, size=100)
-    hits = res.get("hits", {}).get("hits", [])
-    return [h["_source"] for h in hits]
+    if search_after is not None:
+        body["search_after"] = search_after
+    res = client.search(index=INDEX_NAME, body=body, size=size)
+    return res.get("hits", {}).get("hits", [])
 
-def route_alert(doc):
-    tag = doc.get("tag")
-    routed_to = departments.get(tag, [])
-    alert_payload = {
+def iter_alert_batches(search_after=None, size=BATCH_SIZE):
+    """Yield (docs, watermark) for every match after search_after, one page at a time"""
+    while True:
+        hits = find_alerts(search_after, size)
+        if not hits:
+            return
+        search_after = hits[-1]["sort"]
+        yield [h["_source"] for h in hits], search_after
+        if len(hits) < size:
+            return
+
+def build_alert_payload(doc):
+    return {
         "doc_id": doc.get("doc_id"),
-        "tag": tag,
+        "tag": doc.get("tag"),
+        "tags": doc.get("tags"),
         "summary": doc.get("summary"),
         "translation": doc.get("translation"),
         "timestamp": doc.get("timestamp"),
-        "routed_to": routed_to,
         "detected_at": datetime.utcnow().isoformat() + "Z"
     }
-    # Simulate sending by writing JSON to outgoing_alerts folder
-    out_file = os.path.join(OUTPUT_ALERT_FOLDER, f"alert_{doc.get('doc_id')}_{int(time.time())}.json")
-    with open(out_file, "w", encoding="utf-8") as f:
-        json.dump(alert_payload, f, ensure_ascii=False, indent=2)
-    print(f"Alert routed for {doc.get('doc_id')} -> {routed_to} (written {out_file})")
-
-def run_once():
-    hits = find_alerts()
-    if not hits:
+
+def route_alerts(docs):
+    # Coalesce the batch: one outgoing message per tag instead of one per document
+    by_tag = {}
+    for doc in docs:
+        payload = build_alert_payload(doc)
+        # Ingested documents carry a list of department tags
+        for tag in doc.get("tags") or [doc.get("tag")]:
+            by_tag.setdefault(tag, []).append(payload)
+
+    # Recipients come from the same ruleset the backend routes uploads with
+    ruleset = get_ruleset()
+    for tag, alerts in by_tag.items():
+        department = ruleset.department_by_tag(tag)
+        routed_to = department.emails if department else []
+        digest = {
+            "tag": tag,
+            "routed_to": routed_to,
+            "ruleset_version": ruleset.version,
+            "alert_count": len(alerts),
+            "alerts": alerts,
+            "detected_at": datetime.utcnow().isoformat() + "Z"
+        }
+        # Simulate sending by writing JSON to outgoing_alerts folder
+        out_file = os.path.join(OUTPUT_ALERT_FOLDER, f"alerts_{tag}_{time.time_ns()}.json")
+        with open(out_file, "w", encoding="utf-8") as f:
+            json.dump(digest, f, ensure_ascii=False, indent=2)
+        print(f"{len(alerts)} alert(s) routed for {tag} -> {routed_to} (written {out_file})")
+
+def route_alert(doc):
+    route_alerts([doc])
+
+def run_once(stop_event=None):
+    """Route every match added since the stored watermark; returns how many were routed"""
+    routed = 0
+    for docs, watermark in iter_alert_batches(load_watermark()):
+        route_alerts(docs)
+        # Only advance once the whole batch is routed; a crash re-routes at most one batch
+        save_watermark(watermark)
+        routed += len(docs)
+        if stop_event is not None and stop_event.is_set():
+            break
+    if not routed:
         print("No alerts found.")
-        return
-    for doc in hits:
-        route_alert(doc)
+    return routed
+
+def run_forever(poll_interval=POLL_INTERVAL, stop_event=None):
+    """Poll for new matches until stop_event is set, finishing the current batch first"""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            run_once(stop_event)
+        except Exception as e:
+            print(f"Alert polling failed: {e}")
+        stop_event.wait(poll_interval)
+
+def install_signal_handlers(stop_event):
+    def request_stop(signum, frame):
+        print("Stopping after the current batch...")
+        stop_event.set()
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
 
 if __name__ == "__main__":
-    # For demo, run once. In prod, schedule or run as worker.
-    run_once()
+    parser = argparse.ArgumentParser(description="Route alert documents found in OpenSearch")
+    parser.add_argument("--watch", action="store_true", help="keep polling for new matches")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between polls")
+    parser.add_argument("--reset", action="store_true", help="forget the watermark and start from the oldest match")
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(WATERMARK_FILE):
+        os.remove(WATERMARK_FILE)
+
+    if args.watch:
+        stop = threading.Event()
+        install_signal_handlers(stop)
+        run_forever(args.interval, stop)
+    else:
+        run_once()
@@ -1,10 +1,12 @@
-from fastapi import FastAPI, UploadFile
+from fastapi import FastAPI, UploadFile, Query
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 import time
-import json
+import codecs
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
 
 app = FastAPI()
 
@@ -18,57 +20,80 @@ app.add_middleware(
 )
 
 STATIC_DIR = os.path.abspath(os.path.dirname(__file__))
+# Legacy whole-file history, imported once into the history store
 DOCUMENTS_JSON = os.path.join(STATIC_DIR, "documents.json")
+DOCUMENTS_DB = os.getenv("DOCUMENTS_DB", os.path.join(STATIC_DIR, "documents.db"))
 
 # Create required directories
 from settings import UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+from backend.app.processor.context import ContextCollector
+from backend.app.processor.ruleset import get_ruleset
+from backend.app.services.history_store import open_history_store, migrate_json_history
+from backend.app.utils.upload_stream import (
+    save_upload, UploadTooLarge, RequestSizeLimitMiddleware, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+)
+
+# Whole multi-file request; each file is also held to MAX_UPLOAD_BYTES while it is saved
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", 10 * MAX_UPLOAD_BYTES))
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES, paths=["/api/upload"])
+
+# Documents are keyed by file name, so re-uploading a file replaces its entry
+history_store = open_history_store(DOCUMENTS_DB)
+migrate_json_history(DOCUMENTS_JSON, history_store, key_field="file_name")
+
 # Mount static files first, but not at root
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
-async def scan_for_alerts(content: bytes, filename: str):
+def iter_text_chunks(path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[str]:
+    """Decoded text of a saved upload, one chunk at a time"""
+    # An incremental decoder never splits a multi-byte character across chunks
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+async def scan_for_alerts(chunks: Iterable[str], filename: str):
     """
-    Simplified scan function that only returns severity level, departments, and keywords.
-    No detailed alerts list.
+    Simplified scan function that returns severity level, departments, keywords and
+    one alert per severity keyword, with the sentence around its first hit as `context`.
+    The text arrives in chunks, so memory stays bounded by the chunk size.
     """
-    alert_patterns = {
-        "critical": ["urgent", "emergency", "critical", "immediate action", "severe", "risk", "danger", "shutdown", "hazard", "delayed"],
-        "high": ["important", "priority", "alert", "warning", "security"],
-        "medium": ["attention", "review", "check", "notify", "consider"],
-        "low": ["info", "update", "status", "report", "normal"]
-    }
-
-    text = content.decode("utf-8", errors="ignore").lower()
+    # Compiled once per ruleset version and shared with the backend AlertDetector
+    ruleset = get_ruleset()
     highest_severity = "low"
     severity_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-    found_keywords = []
-
-    for severity, keywords in alert_patterns.items():
-        for keyword in keywords:
-            if keyword in text:
-                found_keywords.append(keyword)
-                if severity_order[severity] < severity_order[highest_severity]:
-                    highest_severity = severity
+    found_keywords = {}
+    found_departments = set()
+    # Cut from the scan buffer by offset, one snippet per keyword
+    contexts = ContextCollector(per_keyword=1)
+
+    for hit, buffer, base in ruleset.matcher.iter_hits_stream(chunks, contexts.window):
+        if hit.group == "severity":
+            if hit.keyword not in found_keywords:
+                found_keywords[hit.keyword] = hit.label
+                contexts.add(hit.keyword, hit, buffer, base)
+            if severity_order[hit.label] < severity_order[highest_severity]:
+                highest_severity = hit.label
+        elif hit.group == "scan_department":
+            found_departments.add(hit.label)
 
     # Determine departments
-    departments = []
-    dept_keywords = {
-        "HR": ["employee", "personnel", "hiring", "staff"],
-        "Finance": ["budget", "cost", "payment", "financial"],
-        "IT": ["system", "network", "software", "technical"],
-        "Admin": ["facility", "office", "administrative", "management"]
-    }
-
-    for dept, keywords in dept_keywords.items():
-        if any(keyword in text for keyword in keywords):
-            departments.append(dept)
+    departments = [dept for dept in ruleset.scan_departments if dept in found_departments]
 
     return {
         "highest_severity": highest_severity if found_keywords else "low",
         "departments": departments or ["General"],
-        "keywords": list(set(found_keywords))
+        "keywords": list(found_keywords),
+        "alerts": [
+            {"keyword": keyword, "severity": severity, "context": contexts.snippets(keyword)[0]["text"]}
+            for keyword, severity in found_keywords.items()
+        ],
+        "ruleset_version": ruleset.version
     }
 
 
@@ -76,42 +101,46 @@ async def scan_for_alerts(content: bytes, filename: str):
 @app.post("/api/upload")
 async def upload_files(files: list[UploadFile]):
     try:
+        # Refuse the whole request before anything is saved if any file is too large
+        for file in files:
+            if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+                return JSONResponse(
+                    status_code=413,
+                    content={"status": "error", "message": f"{file.filename}: {str(UploadTooLarge(MAX_UPLOAD_BYTES))}"}
+                )
+
         processed_docs = []
-        existing_docs = {}
-        
-        # Load existing documents into a dictionary keyed by filename
-        if os.path.exists(DOCUMENTS_JSON):
-            with open(DOCUMENTS_JSON, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                existing_docs = {doc["file_name"]: doc for doc in data.get("documents", [])}
+        failed_docs = []
 
         # Process files, updating existing entries if present
         for file in files:
-            content = await file.read()
             file_location = os.path.join(UPLOAD_DIR, file.filename)
-            with open(file_location, "wb") as f:
-                f.write(content)
-
-            scan_results = await scan_for_alerts(content, file.filename)
+            try:
+                await save_upload(file, file_location)
+            except UploadTooLarge as e:
+                # Only for files whose size was not known up front; the others are kept
+                failed_docs.append({"file_name": file.filename, "status_code": 413, "message": str(e)})
+                continue
+
+            scan_results = await scan_for_alerts(iter_text_chunks(file_location), file.filename)
             
             doc_info = {
                 "file_name": file.filename,
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "highest_severity": scan_results["highest_severity"],
                 "departments": scan_results["departments"],
-                "keywords": scan_results["keywords"]
+                "keywords": scan_results["keywords"],
+                "alerts": scan_results["alerts"],
+                "ruleset_version": scan_results["ruleset_version"]
             }
             # Update or add the document
-            existing_docs[file.filename] = doc_info
+            history_store.put(doc_info, key=file.filename)
             processed_docs.append(doc_info)
 
-        # Save updated documents list
-        with open(DOCUMENTS_JSON, "w", encoding="utf-8") as f:
-            json.dump({"documents": list(existing_docs.values())}, f, ensure_ascii=False, indent=2)
-
         return JSONResponse({
-            "status": "success",
+            "status": "success" if not failed_docs else "partial",
             "processed": processed_docs,
+            "failed": failed_docs,
             "message": f"Processed {len(processed_docs)} files"
         })
     except Exception as e:
@@ -121,28 +150,28 @@ async def upload_files(files: list[UploadFile]):
         )
 
 
-def get_severity_order(severity: str) -> int:
-    order = {
-        "critical": 0,
-        "high": 1,
-        "medium": 2,
-        "low": 3,
-        "none": 4
-    }
-    return order.get(severity.lower(), 5)
-
-
 @app.get("/api/documents")
-async def get_documents():
+async def get_documents(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    severity: Optional[str] = Query(None, description="Comma-separated severities, e.g. critical,high"),
+    department: Optional[str] = None,
+    keyword: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
     try:
-        if os.path.exists(DOCUMENTS_JSON):
-            with open(DOCUMENTS_JSON, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                data["documents"].sort(
-                    key=lambda x: get_severity_order(x.get("highest_severity", "none"))
-                )
-                return data
-        return {"documents": []}
+        severities = [s.strip() for s in severity.split(",") if s.strip()] if severity else None
+        documents, next_cursor = history_store.query(
+            limit=limit, cursor=cursor, severities=severities,
+            department=department, keyword=keyword, since=since, until=until
+        )
+        return {"documents": documents, "next_cursor": next_cursor}
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": str(e)}
+        )
     except Exception as e:
         print(f"Error loading documents: {str(e)}")
         return JSONResponse(
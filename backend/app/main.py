@@ -1,15 +1,33 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import aiofiles
+from fastapi.responses import JSONResponse, Response, FileResponse
+from contextlib import contextmanager
+import asyncio
 import os
-import magic
 import logging
+import uuid
 from datetime import datetime
-import json
+from typing import Callable, List, Optional, Tuple
 
 from .processor.document import process_document
+from .processor.executor import ProcessingTimeout, get_executor
+from .processor.file_types import UnsupportedFileType, sniff_file_type, sniff_path
+from .processor.ruleset import get_ruleset
+from .services.accuracy_service import get_accuracy_service
+from .services.history_store import open_history_store, migrate_json_history
+from .services.result_cache import ResultCache, get_result_cache
+from .services.job_queue import JobQueue, JobWorkerPool
+from .services.search_index import SearchIndex
 from .utils.email_sender import send_alert_emails
+from .utils.notifications import get_notification_dispatcher
+from .utils.metrics import (
+    get_metrics_registry, CONTENT_TYPE, STAGE_SECONDS, UPLOAD_SECONDS, DOCUMENTS, DOCUMENT_BYTES, ALERTS, ERRORS,
+    UPLOADS_IN_FLIGHT
+)
+from .utils import profiling
+from .utils.upload_stream import (
+    save_upload, SavedUpload, UploadTooLarge, RequestSizeLimitMiddleware, MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,147 +43,535 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-ALLOWED_MIME_TYPES = [
-    'application/pdf',
-    'application/msword',
-    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    'text/plain'
-]
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 50))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", 10 * MAX_UPLOAD_BYTES))
+
+# Refuse oversized uploads before the multipart body is parsed
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+    paths=["/upload/"]
+)
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_BATCH_BYTES, paths=["/upload/batch"])
 
+# Legacy whole-file history, imported once into the history store
 HISTORY_FILE = os.path.join(os.path.dirname(__file__), "data", "document_history.json")
+HISTORY_DB = os.getenv("HISTORY_DB", os.path.join(os.path.dirname(__file__), "data", "document_history.db"))
+
+history_store = open_history_store(HISTORY_DB)
+migrate_json_history(HISTORY_FILE, history_store)
 
-def save_to_history(document_data: dict):
-    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
-    
-    # Read existing history
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, 'r') as f:
-            history = json.load(f)
-    else:
-        history = {"documents": []}
-    
-    # Add timestamp and document data
+result_cache = get_result_cache()
+
+# Full-text index over extracted text and summaries, updated as documents are saved
+SEARCH_INDEX_DB = os.getenv("SEARCH_INDEX_DB", os.path.join(os.path.dirname(__file__), "data", "search_index.db"))
+search_index = SearchIndex(SEARCH_INDEX_DB)
+
+# Durable queue and spool directory for ?async=true uploads
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", os.path.join(os.path.dirname(__file__), "data", "jobs.db"))
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join("uploads", "queue"))
+
+@contextmanager
+def stage(name: str):
+    # Every stage feeds the latency histogram, and the profiler when the request is profiled
+    # Only for synchronous blocks: across an await the profiler would also count other requests
+    with STAGE_SECONDS.time(stage=name), profiling.profile_stage(name):
+        yield
+
+@contextmanager
+def timed_stage(name: str):
+    # Stages that await are timed but not profiled
+    with STAGE_SECONDS.time(stage=name):
+        yield
+
+def _stamp_history_entry(document_data: dict):
     document_data['timestamp'] = datetime.now().isoformat()
-    history['documents'].append(document_data)
-    
-    # Save updated history
-    with open(HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
+    document_data['document_id'] = history_store.new_key()
+
+def save_to_history(document_data: dict) -> str:
+    # Add timestamp and id, then append the document to the store
+    _stamp_history_entry(document_data)
+    texts = pop_search_texts([document_data])
+    with stage('history'):
+        key = history_store.put(document_data, key=document_data['document_id'])
+    index_for_search([document_data], texts)
+    return key
+
+def save_many_to_history(documents: List[dict]) -> List[str]:
+    # One transaction for the whole batch
+    for document_data in documents:
+        _stamp_history_entry(document_data)
+    texts = pop_search_texts(documents)
+    with stage('history'):
+        keys = history_store.put_many(documents, [document_data['document_id'] for document_data in documents])
+    index_for_search(documents, texts)
+    return keys
+
+# Extracted text travels with a new entry until it is saved; it is never stored in history
+SEARCH_TEXT_FIELD = '_search_text'
+
+def pop_search_texts(documents: List[dict]) -> List[Tuple[str, str, Optional[str]]]:
+    texts = []
+    for document_data in documents:
+        text = document_data.pop(SEARCH_TEXT_FIELD, None)
+        if text is not None:
+            texts.append((document_data['content_hash'], text, document_data.get('summary')))
+    return texts
+
+def index_for_search(documents: List[dict], texts: List[Tuple[str, str, Optional[str]]]):
+    # Only called once history is saved, so every indexed text has a document
+    # Search is secondary; a failure here must not fail an upload that is already saved
+    try:
+        with stage('search_index'):
+            for content_hash, text, summary in texts:
+                search_index.add_text(content_hash, text, summary)
+            search_index.add_documents(documents)
+    except Exception as e:
+        logger.error(f"Failed to index documents for search: {str(e)}")
+
+def duplicate_history_entry(cached: dict, file_name: str, cache_key: str) -> dict:
+    # The entry references the cached result instead of storing another copy of it
+    return {
+        'file_name': file_name,
+        'highest_severity': cached.get('highest_severity'),
+        'departments': cached.get('departments', []),
+        'content_hash': cached.get('content_hash'),
+        'ruleset_version': cached.get('ruleset_version'),
+        'result_ref': cache_key,
+        'duplicate_of': cached.get('document_id')
+    }
+
+def resolve_result_ref(document: dict) -> dict:
+    """Expand a history entry that references a cached result"""
+    if 'result_ref' not in document:
+        return document
+    result = result_cache.get(document['result_ref'])
+    if result is None and document.get('duplicate_of'):
+        result = history_store.get(document['duplicate_of'])
+    if result is None:
+        return document
+    result.update(document)
+    return result
+
+@app.on_event("startup")
+async def warm_accuracy_snapshot():
+    # Evaluate the accuracy suite once in the background so uploads only read the cached snapshot
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, get_accuracy_service().ensure_snapshot)
+    future.add_done_callback(_log_snapshot_failure)
+
+@app.on_event("startup")
+async def start_processing_executor():
+    # Spawn and warm the parsing workers before the first upload arrives
+    await asyncio.get_running_loop().run_in_executor(None, get_executor().start)
+
+@app.on_event("shutdown")
+async def stop_processing_executor():
+    get_executor().shutdown()
+
+def _log_snapshot_failure(future):
+    if not future.cancelled() and future.exception():
+        logger.error(f"Failed to compute accuracy snapshot: {str(future.exception())}")
 
 @app.get("/")
 async def root():
     return {"status": "running", "service": "Document Processing API"}
 
 @app.get("/documents/")
-async def get_documents():
+async def get_documents(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    severity: Optional[str] = Query(None, description="Comma-separated severities, e.g. critical,high"),
+    department: Optional[str] = None,
+    keyword: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
     try:
-        # Create data directory if it doesn't exist
-        os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
-        
-        if not os.path.exists(HISTORY_FILE):
-            # Initialize empty history file
-            with open(HISTORY_FILE, 'w') as f:
-                json.dump({"documents": []}, f)
-            return {"documents": []}
-            
-        with open(HISTORY_FILE, 'r') as f:
-            history = json.load(f)
-        
-        # Sort documents by severity and timestamp
-        documents = history.get('documents', [])
-        if not isinstance(documents, list):
-            documents = []
-        severity_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
-        documents.sort(
-            key=lambda x: (severity_order.get(x.get('highest_severity', 'low'), 4), x.get('timestamp', '')),
-            reverse=True
+        # Documents come back most severe first, newest first, straight from the store's index
+        severities = [s.strip() for s in severity.split(',') if s.strip()] if severity else None
+        documents, next_cursor = history_store.query(
+            limit=limit, cursor=cursor, severities=severities,
+            department=department, keyword=keyword, since=since, until=until
         )
-        
-        return {"documents": documents}
+        return {"documents": [resolve_result_ref(doc) for doc in documents], "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/upload/")
-async def upload_file(file: UploadFile = File(...)):
+async def save_incoming_upload(file: UploadFile, upload_dir: str = "uploads") -> Tuple[str, SavedUpload]:
+    # Validate file existence
+    if not file or not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    # Create uploads directory if it doesn't exist
+    os.makedirs(upload_dir, exist_ok=True)
+
+    # Save the uploaded file under a unique name so concurrent uploads never collide
+    file_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}_{os.path.basename(file.filename)}")
+    logger.info(f"Saving file to: {file_path}")
+
+    try:
+        with timed_stage('save'):
+            saved = await save_upload(file, file_path, sniff=sniff_mime_type)
+        DOCUMENT_BYTES.inc(saved.size)
+        return file_path, saved
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedFileType as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to save file: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to save uploaded file")
+
+def sniff_mime_type(header: bytes) -> str:
+    # Runs on the first chunk of an upload, before anything is written to disk
+    with STAGE_SECONDS.time(stage='mime_check'):
+        mime_type = sniff_file_type(header).mime_type
+    logger.info(f"Detected MIME type: {mime_type}")
+    return mime_type
+
+async def process_saved_upload(file_path: str, file_name: str, saved: SavedUpload,
+                               on_stage: Optional[Callable[[str], None]] = None) -> Tuple[dict, dict, Optional[str]]:
+    """Process a saved upload without writing history.
+
+    The upload's type was sniffed and validated when it was saved.
+    Returns the response body, the history entry to record and, for a newly
+    processed document, the key to cache its result under.
+    """
+    report = on_stage or (lambda stage: None)
+
+    # Identical content under the same ruleset has been processed before
+    ruleset_version = get_ruleset().version
+    cache_key = ResultCache.make_key(saved.sha256, ruleset_version)
+    with stage('cache_lookup'):
+        cached = result_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Returning cached result for {file_name}")
+        DOCUMENTS.inc(outcome='cached')
+        cached['cached'] = True
+        return cached, duplicate_history_entry(cached, file_name, cache_key), None
+
+    # Process document
+    report('processing')
+    try:
+        result = await process_document(file_path, include_text=True, mime_type=saved.mime_type)
+    except ProcessingTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+    # Indexed once per content, after the history entry is saved
+    result[SEARCH_TEXT_FIELD] = result.pop('text')
+
+    # Add metadata
+    result['file_name'] = file_name
+    result['content_hash'] = saved.sha256
+    result['size_bytes'] = saved.size
+    if result['ruleset_version'] != ruleset_version:
+        # The ruleset was reloaded while the document was processed
+        cache_key = ResultCache.make_key(saved.sha256, result['ruleset_version'])
+    result['highest_severity'] = max(
+        (alert['severity'] for alert in result.get('alerts', [])),
+        default='low',
+        key=lambda x: {'critical': 3, 'high': 2, 'medium': 1, 'low': 0}[x]
+    )
+    DOCUMENTS.inc(outcome='processed')
+    for alert in result.get('alerts', []):
+        ALERTS.inc(severity=alert['severity'])
+    return result, result, cache_key
+
+def remove_upload(file_path: str):
+    # Cleanup: remove the uploaded file
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    except Exception as e:
+        logger.error(f"Failed to cleanup file: {str(e)}")
+
+async def process_upload(file: UploadFile) -> Tuple[dict, dict, Optional[str]]:
+    file_path, saved = await save_incoming_upload(file)
     try:
-        # Validate file existence
-        if not file:
-            raise HTTPException(status_code=400, detail="No file provided")
-
-        # Create uploads directory if it doesn't exist
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save the uploaded file
-        file_path = os.path.join(upload_dir, file.filename)
-        logger.info(f"Saving file to: {file_path}")
-        
+        return await process_saved_upload(file_path, file.filename, saved)
+    finally:
+        remove_upload(file_path)
+
+async def finish_upload(result: dict, entry: dict, cache_key: Optional[str]):
+    """Post-history steps: cache the result and notify departments for new documents"""
+    # Duplicates report their own history id and timestamp
+    result.update(entry)
+    if cache_key is None:
+        return
+
+    result_cache.put(cache_key, result)
+
+    # Queue email alerts; the notification dispatcher batches and sends them
+    if result.get('alerts'):
         try:
-            async with aiofiles.open(file_path, 'wb') as out_file:
-                content = await file.read()
-                await out_file.write(content)
+            with timed_stage('notify'):
+                await send_alert_emails(result)
         except Exception as e:
-            logger.error(f"Failed to save file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to save uploaded file")
+            logger.error(f"Failed to send email alerts: {str(e)}")
+            # Don't raise exception here, continue with response
 
-        # Check file type
+async def run_upload_job(job: dict, set_stage: Callable[[str], None]) -> dict:
+    """Queue worker handler: the same pipeline as /upload/, on a spooled file"""
+    payload = job['payload']
+    saved = SavedUpload(path=payload['file_path'], size=payload['size'], sha256=payload['sha256'],
+                        mime_type=payload.get('mime_type'))
+    try:
+        with UPLOADS_IN_FLIGHT.track(), UPLOAD_SECONDS.time(endpoint='job'):
+            if not os.path.exists(saved.path):
+                raise HTTPException(status_code=410, detail="Spooled upload is no longer available")
+            if saved.mime_type is None:
+                # Queued before types were sniffed on upload
+                set_stage('validating')
+                try:
+                    saved.mime_type = sniff_path(saved.path).mime_type
+                except UnsupportedFileType as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            result, entry, cache_key = await process_saved_upload(saved.path, payload['file_name'], saved, set_stage)
+            set_stage('saving')
+            save_to_history(entry)
+            set_stage('notifying')
+            await finish_upload(result, entry, cache_key)
+    except asyncio.CancelledError:
+        # The worker pool puts the job back in the queue; keep its file for the next run
+        raise
+    except Exception as e:
+        ERRORS.inc(status_code=getattr(e, 'status_code', 500))
+        remove_upload(saved.path)
+        raise
+    remove_upload(saved.path)
+    return result
+
+job_queue = JobQueue(JOB_QUEUE_DB)
+job_workers = JobWorkerPool(job_queue, run_upload_job)
+
+# Read at scrape time only
+get_metrics_registry().gauge('docproc_job_queue_depth', 'Upload jobs waiting for a worker', callback=job_queue.depth)
+get_metrics_registry().gauge(
+    'docproc_notification_queue_depth', 'Department alerts waiting to be sent',
+    callback=lambda: get_notification_dispatcher().depth()
+)
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_workers.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_workers.stop()
+
+@app.on_event("shutdown")
+async def flush_notifications():
+    # Registered after the job workers so alerts from their last jobs are still sent
+    await get_notification_dispatcher().stop()
+
+@app.post("/upload/")
+async def upload_file(
+    request: Request,
+    file: UploadFile = File(...),
+    async_mode: bool = Query(False, alias="async"),
+    profile: bool = Query(False, description="Profile this upload; requires X-Admin-Token")
+):
+    with UPLOADS_IN_FLIGHT.track(), UPLOAD_SECONDS.time(endpoint='upload'):
+        if not (profile or request.headers.get('x-profile', '').lower() in ('1', 'true', 'yes')):
+            return await _upload_file(file, async_mode)
+        return await _profiled_upload(request, file, async_mode)
+
+async def _profiled_upload(request: Request, file: UploadFile, async_mode: bool):
+    try:
+        profiling.authorize(request.headers.get('x-admin-token'))
+    except profiling.ProfilingDenied as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if async_mode:
+        raise HTTPException(status_code=400, detail="Profiling is only available for synchronous uploads")
+
+    async with profiling.profile_request() as run:
+        headers = {'X-Profile-Id': run.request_id, 'X-Profile-Url': f"/profiles/{run.request_id}"}
         try:
-            mime_type = magic.from_file(file_path, mime=True)
-            logger.info(f"Detected MIME type: {mime_type}")
-            
-            if mime_type not in ALLOWED_MIME_TYPES:
-                os.remove(file_path)
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File type {mime_type} not allowed. Allowed types: {ALLOWED_MIME_TYPES}"
-                )
-        except Exception as e:
-            logger.error(f"Failed to check file type: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to validate file type")
-
-        # Process document
-        result = await process_document(file_path)
-        
-        # Add metadata
-        result['file_name'] = file.filename
-        result['highest_severity'] = max(
-            (alert['severity'] for alert in result.get('alerts', [])),
-            default='low',
-            key=lambda x: {'critical': 3, 'high': 2, 'medium': 1, 'low': 0}[x]
-        )
-        
-        # Save to history
-        save_to_history(result)
+            response = await _upload_file(file, async_mode)
+        except HTTPException as he:
+            # Failing documents are often the ones worth profiling
+            he.headers = {**(he.headers or {}), **headers}
+            raise
+    response.headers.update(headers)
+    return response
 
-        # Send email alerts
-        if result.get('alerts'):
-            try:
-                await send_alert_emails(result)
-            except Exception as e:
-                logger.error(f"Failed to send email alerts: {str(e)}")
-                # Don't raise exception here, continue with response
+async def _upload_file(file: UploadFile, async_mode: bool):
+    try:
+        if async_mode:
+            # Accept-then-process: spool the file durably and hand it to the job workers
+            file_path, saved = await save_incoming_upload(file, JOB_SPOOL_DIR)
+            # The queue write may wait on another process's lock; keep it off the event loop
+            job_id = await asyncio.get_running_loop().run_in_executor(None, job_queue.enqueue, {
+                'file_path': file_path,
+                'file_name': file.filename,
+                'size': saved.size,
+                'sha256': saved.sha256,
+                'mime_type': saved.mime_type
+            })
+            job_workers.notify()
+            return JSONResponse(status_code=202, content={
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f"/jobs/{job_id}"
+            })
+
+        result, entry, cache_key = await process_upload(file)
+
+        # Save to history
+        save_to_history(entry)
+        await finish_upload(result, entry, cache_key)
 
         return JSONResponse(content=result)
 
     except HTTPException as he:
+        ERRORS.inc(status_code=he.status_code)
         raise he
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
+        ERRORS.inc(status_code=500)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
-    finally:
-        # Cleanup: remove the uploaded file
-        try:
-            if 'file_path' in locals() and os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception as e:
-            logger.error(f"Failed to cleanup file: {str(e)}")
+
+@app.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    with UPLOADS_IN_FLIGHT.track(), UPLOAD_SECONDS.time(endpoint='batch'):
+        return await _upload_batch(files)
+
+async def _upload_batch(files: List[UploadFile]):
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per batch")
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(file: UploadFile):
+        # A failing file is reported in its own result and never aborts the batch
+        async with semaphore:
+            try:
+                return await process_upload(file)
+            except HTTPException as he:
+                ERRORS.inc(status_code=he.status_code)
+                return he
+            except Exception as e:
+                logger.error(f"Unexpected error processing {file.filename}: {str(e)}")
+                ERRORS.inc(status_code=500)
+                return HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+    outcomes = await asyncio.gather(*(run(file) for file in files))
+    processed = [outcome for outcome in outcomes if not isinstance(outcome, HTTPException)]
+
+    try:
+        save_many_to_history([entry for _, entry, _ in processed])
+    except Exception as e:
+        logger.error(f"Failed to save batch to history: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to save batch to history: {str(e)}")
+
+    results = []
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, HTTPException):
+            results.append({
+                'file_name': file.filename,
+                'status': 'error',
+                'status_code': outcome.status_code,
+                'error': outcome.detail
+            })
+        else:
+            result, entry, cache_key = outcome
+            await finish_upload(result, entry, cache_key)
+            results.append({'file_name': file.filename, 'status': 'success', 'result': result})
+
+    return JSONResponse(content={
+        'results': results,
+        'processed': len(processed),
+        'failed': len(files) - len(processed)
+    })
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.get_running_loop().run_in_executor(None, job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'file_name': job['payload'].get('file_name'),
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'result': job['result'],
+        'error': job['error']
+    }
+
+def _require_admin(request: Request):
+    try:
+        profiling.authorize(request.headers.get('x-admin-token'))
+    except profiling.ProfilingDenied as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+@app.get("/profiles/{request_id}")
+async def get_profile(request_id: str, request: Request):
+    _require_admin(request)
+    summary = profiling.load_summary(request_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+@app.get("/profiles/{request_id}/{stage_name}.prof")
+async def get_profile_stage(request_id: str, stage_name: str, request: Request):
+    _require_admin(request)
+    path = profiling.stage_file(request_id, stage_name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type='application/octet-stream', filename=f"{request_id}-{stage_name}.prof")
+
+@app.get("/search")
+async def search_documents(
+    q: str = Query(..., min_length=1, description='Words and "quoted phrases"; OR between terms matches either'),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    order: str = Query('relevance', pattern='^(relevance|recent)$')
+):
+    try:
+        results = search_index.search(q, limit=limit, offset=offset, order=order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Search failed for {q!r}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Search failed")
+    return {
+        'query': q,
+        'results': results[:limit],
+        'next_offset': offset + limit if len(results) > limit else None
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=get_metrics_registry().render(), media_type=CONTENT_TYPE)
+
+@app.get("/ruleset")
+async def get_active_ruleset():
+    ruleset = get_ruleset()
+    return {
+        'version': ruleset.version,
+        'revision': ruleset.revision,
+        'departments': [
+            {'id': dept.id, 'name': dept.name, 'tag': dept.tag, 'has_recipients': bool(dept.emails)}
+            for dept in ruleset.departments.values()
+        ]
+    }
 
 @app.get("/test-accuracy")
-async def test_accuracy():
+async def test_accuracy(background_tasks: BackgroundTasks, chart: bool = Query(False), force: bool = Query(False)):
     try:
-        from tests.accuracy_tester import AccuracyTester
-        tester = AccuracyTester()
-        results = tester.run_accuracy_test()
+        # Served from the report cache unless the corpus or ruleset changed, or force is set
+        service = get_accuracy_service()
+        results = await asyncio.get_running_loop().run_in_executor(None, service.refresh, force)
+        if chart:
+            # Rendered after the response is sent
+            background_tasks.add_task(service.render_chart, results)
         return JSONResponse(content=results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
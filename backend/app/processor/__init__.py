@@ -1,4 +1,6 @@
 from .document import process_document
 from .alert_detector import AlertDetector
+from .keyword_matcher import KeywordMatcher
+from .ruleset import Ruleset, get_ruleset, get_default_matcher
 
-__all__ = ['process_document', 'AlertDetector']
\ No newline at end of file
+__all__ = ['process_document', 'AlertDetector', 'KeywordMatcher', 'Ruleset', 'get_ruleset', 'get_default_matcher']
\ No newline at end of file
@@ -1,39 +1,70 @@
-from typing import List, Dict
-import re
+from typing import List, Dict, Iterable, Optional, Tuple
+from .context import ContextCollector
+from .keyword_matcher import KeywordHit
+from .ruleset import Ruleset, get_ruleset
 
 class AlertDetector:
-    def __init__(self):
-        self.alert_patterns = {
-            'safety': r'(?i)(hazard|danger|emergency|evacuation|safety concern|chemical|fire)',
-            'maintenance': r'(?i)(maintenance|repair|breakdown|malfunction|delay|equipment)',
-            'hr': r'(?i)(personnel|employee|staff|workforce|attendance|injury)'
-        }
-        
+    def __init__(self, ruleset: Ruleset = None):
+        # Bound to one ruleset version for the detector's lifetime, even across reloads
+        self.ruleset = ruleset or get_ruleset()
+        self.matcher = self.ruleset.matcher
+        self.departments = self.ruleset.detector_departments
+
     def detect_alerts(self, text: str) -> List[Dict]:
+        return self.build_alerts(self.matcher.iter_hits(text), text)
+
+    def detect_alerts_stream(self, chunks: Iterable[str]) -> List[Dict]:
+        """Same alerts as detect_alerts on the joined chunks, in memory bounded by the chunk size"""
+        contexts = ContextCollector()
+        return self._build_alerts(self.matcher.iter_hits_stream(chunks, contexts.window), contexts)
+
+    def build_alerts(self, hits: Iterable[KeywordHit], text: Optional[str] = None) -> List[Dict]:
+        """Turn matcher hits from a single scan into per-department alerts.
+
+        With the scanned text, each alert also carries bounded context
+        snippets cut around its hits by offset.
+        """
+        contexts = ContextCollector() if text is not None else None
+        return self._build_alerts(((hit, text, 0) for hit in hits), contexts)
+
+    def _build_alerts(self, hits: Iterable[Tuple[KeywordHit, Optional[str], int]],
+                      contexts: Optional[ContextCollector]) -> List[Dict]:
+        dept_keywords = {dept: {} for dept in self.departments}
+        urgent_words = set()
+        warning_words = set()
+
+        for hit, text, base in hits:
+            if hit.group == 'department':
+                dept_keywords[hit.label][hit.keyword] = None
+                if contexts is not None:
+                    contexts.add(hit.label, hit, text, base)
+            elif hit.group == 'urgency':
+                if hit.label == 'urgent':
+                    urgent_words.add(hit.keyword)
+                else:
+                    warning_words.add(hit.keyword)
+
+        severity = self._calculate_severity(len(urgent_words), len(warning_words))
         alerts = []
-        
-        for dept, pattern in self.alert_patterns.items():
-            matches = re.findall(pattern, text)
-            if matches:
-                alerts.append({
+
+        for dept in self.departments:
+            if dept_keywords[dept]:
+                alert = {
                     'department': dept,
-                    'keywords': list(set(matches)),
-                    'severity': self._calculate_severity(text)
-                })
-        
+                    'keywords': list(dept_keywords[dept]),
+                    'severity': severity
+                }
+                if contexts is not None:
+                    alert['contexts'] = contexts.snippets(dept)
+                alerts.append(alert)
+
         return alerts
 
-    def _calculate_severity(self, text: str) -> str:
-        urgent_words = ['immediate', 'urgent', 'emergency', 'critical']
-        warning_words = ['caution', 'warning', 'attention']
-        
-        urgent_count = sum(1 for word in urgent_words if word.lower() in text.lower())
-        warning_count = sum(1 for word in warning_words if word.lower() in text.lower())
-        
+    def _calculate_severity(self, urgent_count: int, warning_count: int) -> str:
         if urgent_count >= 2:
             return 'critical'
         elif urgent_count == 1 or warning_count >= 2:
             return 'high'
         elif warning_count == 1:
             return 'medium'
-        return 'low'
\ No newline at end of file
+        return 'low'
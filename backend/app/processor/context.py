@@ -0,0 +1,92 @@
+from typing import Dict, List, Tuple
+import os
+
+from .keyword_matcher import KeywordHit
+
+# Characters of context taken on each side of a hit before snapping to sentence boundaries
+ALERT_CONTEXT_CHARS = int(os.getenv('ALERT_CONTEXT_CHARS', 120))
+# Snippets kept per keyword and label; later hits of a keyword only count as seen
+ALERT_CONTEXT_PER_KEYWORD = int(os.getenv('ALERT_CONTEXT_PER_KEYWORD', 3))
+# Overlapping windows are merged up to this length, after which a new snippet starts
+ALERT_CONTEXT_MAX_LENGTH = int(os.getenv('ALERT_CONTEXT_MAX_LENGTH', 600))
+
+SENTENCE_ENDS = '.!?\n'
+
+
+def _sentence_start(text: str, lo: int, pos: int, cut: bool) -> int:
+    """Start of the sentence containing pos, or the first word boundary after lo if lo cuts the text"""
+    boundary = max(text.rfind(char, lo, pos) for char in SENTENCE_ENDS)
+    if boundary >= 0:
+        return boundary + 1
+    if cut:
+        space = text.find(' ', lo, pos)
+        if space >= 0:
+            return space + 1
+    return lo
+
+
+def _sentence_end(text: str, pos: int, hi: int, cut: bool) -> int:
+    """End of the sentence containing pos, or the last word boundary before hi if hi cuts the text"""
+    found = [index for index in (text.find(char, pos, hi) for char in SENTENCE_ENDS) if index >= 0]
+    if found:
+        return min(found) + 1
+    if cut:
+        space = text.rfind(' ', pos, hi)
+        if space >= 0:
+            return space
+    return hi
+
+
+class ContextCollector:
+    """Bounded context snippets around keyword hits, built during the detection scan.
+
+    Hits must arrive in offset order, as the matcher yields them. Each hit is
+    cut from the text by offset, so nothing is searched for twice; windows of
+    the same label that overlap are merged, and each keyword contributes at
+    most `per_keyword` snippets per label, so a noisy document cannot grow the
+    result without bound.
+
+    `text` may be a slice of a larger document starting at `base`, as long as
+    it covers `window` characters around each hit passed with it.
+    """
+
+    def __init__(self, window: int = ALERT_CONTEXT_CHARS, per_keyword: int = ALERT_CONTEXT_PER_KEYWORD,
+                 max_length: int = ALERT_CONTEXT_MAX_LENGTH):
+        self.window = window
+        self.per_keyword = per_keyword
+        self.max_length = max_length
+        self._snippets: Dict[str, List[Dict]] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def add(self, label: str, hit: KeywordHit, text: str, base: int = 0):
+        snippets = self._snippets.setdefault(label, [])
+        last = snippets[-1] if snippets else None
+        if last is not None and hit.end <= last['end'] and hit.keyword in last['keywords']:
+            # Already visible in the current snippet
+            return
+        key = (label, hit.keyword)
+        if self._counts.get(key, 0) >= self.per_keyword:
+            return
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+        lo = max(hit.start - self.window, base)
+        hi = min(hit.end + self.window, base + len(text))
+        start = base + _sentence_start(text, lo - base, hit.start - base, lo > 0)
+        end = base + _sentence_end(text, hit.end - base, hi - base, hi < base + len(text))
+
+        if last is not None and start <= last['end'] and max(end, last['end']) - last['start'] <= self.max_length:
+            if end > last['end']:
+                last['text'] += text[last['end'] - base:end - base]
+                last['end'] = end
+            if hit.keyword not in last['keywords']:
+                last['keywords'].append(hit.keyword)
+            return
+
+        snippets.append({'text': text[start - base:end - base], 'start': start, 'end': end, 'keywords': [hit.keyword]})
+
+    def snippets(self, label: str) -> List[Dict]:
+        """Snippets of a label in document order, with whitespace collapsed"""
+        return [
+            {**snippet, 'text': ' '.join(snippet['text'].split()), 'keywords': list(snippet['keywords'])}
+            for snippet in self._snippets.get(label, [])
+        ]
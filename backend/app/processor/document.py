@@ -1,52 +1,74 @@
-from typing import Dict
-from .alert_detector import AlertDetector
+from typing import Dict, Optional
+from .executor import ProcessingTimeout, get_executor, parse_and_detect
+from .ruleset import get_ruleset
+from ..utils.metrics import STAGE_SECONDS
+from ..utils.profiling import current_profile
+import time
 import os
 
+# Off by default: the summarization model is large and slow to load
+SUMMARIZE_UPLOADS = os.getenv('SUMMARIZE_UPLOADS', 'false').lower() == 'true'
+
 class DocumentProcessor:
     def __init__(self):
-        self.alert_detector = AlertDetector()
+        self.executor = get_executor()
 
-    async def process_document(self, file_path: str) -> Dict:
+    async def process_document(self, file_path: str, include_text: bool = False,
+                               mime_type: Optional[str] = None) -> Dict:
         try:
-            # Parse document content
-            from .document_parser import DocumentParser
-            parser = DocumentParser()
-            content = parser.parse(file_path)
-            if not content:
-                raise ValueError("No content extracted from document")
-                
-            # Get accuracy metrics
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            from tests.accuracy_tester import AccuracyTester
-            tester = AccuracyTester()
-            accuracy_results = tester.run_accuracy_test()
-
-            # Detect alerts
-            alerts = self.alert_detector.detect_alerts(content)
+            # Parse document content and detect alerts off the event loop
+            profile = current_profile()
+            start = time.perf_counter()
+            content, alerts, ruleset_version, timings, profiles = await self.executor.run(
+                parse_and_detect, file_path, profile is not None, mime_type)
+            elapsed = time.perf_counter() - start
+            for stage, stats in profiles.items():
+                profile.add(stage, stats)
+            for stage, seconds in timings.items():
+                STAGE_SECONDS.observe(seconds, stage=stage)
+            # Whatever the worker did not spend working was spent waiting for a free worker
+            STAGE_SECONDS.observe(max(elapsed - sum(timings.values()), 0.0), stage='executor_wait')
+
+            # Latest accuracy snapshot; never evaluated here, so None until the first evaluation is done
+            from ..services.accuracy_service import get_accuracy_service
+            accuracy_results = get_accuracy_service().get_snapshot() or {'metrics': None, 'overall_accuracy': None}
 
             # Prepare response
+            departments = get_ruleset().departments
             result = {
                 'file_name': os.path.basename(file_path),
                 'content_preview': content[:200] + '...' if len(content) > 200 else content,
                 'alerts': alerts,
+                'ruleset_version': ruleset_version,
                 'metrics': accuracy_results['metrics'],
                 'overall_accuracy': accuracy_results['overall_accuracy'],
                 'departments': [
                     {
-                        'name': alert['department'].title() + ' Department',
+                        'id': alert['department'],
+                        'name': departments[alert['department']].name if alert['department'] in departments
+                        else alert['department'].title() + ' Department',
                         'severity': alert['severity'],
                         'keywords': alert['keywords']
                     } for alert in alerts
                 ]
             }
 
+            if SUMMARIZE_UPLOADS:
+                from ..services.summarizer import get_summarization_service
+                with STAGE_SECONDS.time(stage='summarize'):
+                    result['summary'] = await get_summarization_service().summarize_async(content)
+
+            if include_text:
+                # Full extracted text, e.g. for the search index; too large to keep in history
+                result['text'] = content
+
             return result
-            
+
+        except ProcessingTimeout:
+            raise
         except Exception as e:
             raise Exception(f"Error processing document: {str(e)}")
 
-async def process_document(file_path: str) -> Dict:
+async def process_document(file_path: str, include_text: bool = False, mime_type: Optional[str] = None) -> Dict:
     processor = DocumentProcessor()
-    return await processor.process_document(file_path)
\ No newline at end of file
+    return await processor.process_document(file_path, include_text, mime_type)
\ No newline at end of file
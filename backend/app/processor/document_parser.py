@@ -1,37 +1,55 @@
-from typing import Dict
-import PyPDF2
+from typing import Dict, Iterator, Optional
+from .file_types import resolve_file_type
+from .pdf_extractor import extract_pdf_text
+from .ocr import ocr_image_file
 import docx
 import os
 
+# Characters decoded per read when streaming a text file
+STREAM_CHUNK_CHARS = int(os.getenv('STREAM_CHUNK_CHARS', 1024 * 1024))
+
 class DocumentParser:
-    def parse(self, file_path: str) -> str:
-        """Parse different document types and return text content"""
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
+    def parse(self, file_path: str, mime_type: Optional[str] = None) -> str:
+        """Parse different document types and return text content.
+
+        Uploads pass the MIME type sniffed from their content; without one
+        the type is taken from the file extension.
+        """
         try:
-            if file_extension == '.pdf':
-                return self._parse_pdf(file_path)
-            elif file_extension in ['.doc', '.docx']:
-                return self._parse_word(file_path)
-            elif file_extension == '.txt':
-                return self._parse_text(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_extension}")
+            file_type = resolve_file_type(file_path, mime_type)
+            return getattr(self, f'_parse_{file_type.parser}')(file_path)
         except Exception as e:
             raise Exception(f"Error parsing document: {str(e)}")
 
+    def can_stream(self, file_path: str, mime_type: Optional[str] = None) -> bool:
+        try:
+            return resolve_file_type(file_path, mime_type).streamable
+        except ValueError:
+            return False
+
+    def iter_text(self, file_path: str, chunk_chars: int = STREAM_CHUNK_CHARS,
+                  mime_type: Optional[str] = None) -> Iterator[str]:
+        """Text of a streamable file in chunks; joined, identical to parse()"""
+        if not self.can_stream(file_path, mime_type):
+            raise ValueError(f"Cannot stream file type: {mime_type or os.path.splitext(file_path)[1].lower()}")
+        # Same decoding and newline handling as _parse_text, one chunk at a time
+        with open(file_path, 'r', encoding='utf-8') as file:
+            while True:
+                chunk = file.read(chunk_chars)
+                if not chunk:
+                    return
+                yield chunk
+
     def _parse_pdf(self, file_path: str) -> str:
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+        return extract_pdf_text(file_path)
 
     def _parse_word(self, file_path: str) -> str:
         doc = docx.Document(file_path)
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
 
+    def _parse_image(self, file_path: str) -> str:
+        return ocr_image_file(file_path)
+
     def _parse_text(self, file_path: str) -> str:
         with open(file_path, 'r', encoding='utf-8') as file:
             return file.read()
\ No newline at end of file
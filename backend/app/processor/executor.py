@@ -0,0 +1,160 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import logging
+import time
+import os
+
+from .alert_detector import AlertDetector
+from .ruleset import get_ruleset
+
+logger = logging.getLogger(__name__)
+
+# inline runs on the event loop, thread uses a thread pool, process uses a process pool
+PROCESSING_MODE = os.getenv('PROCESSING_MODE', 'thread')
+PROCESSING_WORKERS = int(os.getenv('PROCESSING_WORKERS', os.cpu_count() or 1))
+PROCESSING_TIMEOUT = float(os.getenv('PROCESSING_TIMEOUT', 120))
+MAX_INFLIGHT_JOBS = int(os.getenv('MAX_INFLIGHT_JOBS', PROCESSING_WORKERS * 2))
+# Text files at least this large are scanned in chunks instead of loaded whole
+STREAM_DETECTION_BYTES = int(os.getenv('STREAM_DETECTION_BYTES', 32 * 1024 * 1024))
+# Leading characters of a streamed file kept as its content (preview, search index, summary)
+STREAM_CONTENT_CHARS = int(os.getenv('STREAM_CONTENT_CHARS', 1024 * 1024))
+
+
+class ProcessingTimeout(Exception):
+    pass
+
+
+def parse_and_detect(file_path: str, profile: bool = False, mime_type: Optional[str] = None
+                     ) -> Tuple[str, List[Dict], str, Dict[str, float], Dict[str, Dict]]:
+    """CPU-bound part of document processing, runnable in a worker process.
+
+    Also returns the version of the ruleset the alerts were detected with, as a
+    worker may have reloaded it, how long parsing and detection took, since
+    metrics recorded inside a worker process would never reach the API process,
+    and with profile=True the raw cProfile stats of each step. mime_type is the
+    type sniffed from the upload's content and selects the parser.
+    """
+    from .document_parser import DocumentParser
+    from ..utils.profiling import profile_call
+    profiles: Dict[str, Dict] = {}
+
+    def run(stage: str, func: Callable, *args):
+        if not profile:
+            return func(*args)
+        result, profiles[stage] = profile_call(func, *args)
+        return result
+
+    parser = DocumentParser()
+    detector = AlertDetector()
+    if parser.can_stream(file_path, mime_type) and os.path.getsize(file_path) >= STREAM_DETECTION_BYTES:
+        content, alerts, timings = run('detect', _stream_and_detect, parser, detector, file_path, mime_type)
+        return content, alerts, detector.ruleset.version, timings, profiles
+
+    start = time.perf_counter()
+    content = run('parse', parser.parse, file_path, mime_type)
+    parsed = time.perf_counter()
+    if not content:
+        raise ValueError("No content extracted from document")
+    alerts = run('detect', detector.detect_alerts, content)
+    return content, alerts, detector.ruleset.version, {'parse': parsed - start, 'detect': time.perf_counter() - parsed}, profiles
+
+
+def _stream_and_detect(parser, detector: AlertDetector, file_path: str,
+                       mime_type: Optional[str] = None) -> Tuple[str, List[Dict], Dict[str, float]]:
+    """Detection over a large text file in constant memory; only its head is kept as content"""
+    head: List[str] = []
+    head_chars = 0
+    read_seconds = 0.0
+
+    def chunks():
+        nonlocal head_chars, read_seconds
+        reader = parser.iter_text(file_path, mime_type=mime_type)
+        while True:
+            started = time.perf_counter()
+            chunk = next(reader, None)
+            read_seconds += time.perf_counter() - started
+            if chunk is None:
+                return
+            if head_chars < STREAM_CONTENT_CHARS:
+                head.append(chunk[:STREAM_CONTENT_CHARS - head_chars])
+                head_chars += len(head[-1])
+            yield chunk
+
+    start = time.perf_counter()
+    alerts = detector.detect_alerts_stream(chunks())
+    content = ''.join(head)
+    if not content:
+        raise ValueError("No content extracted from document")
+    # Reading and scanning interleave; reading counts as parsing
+    return content, alerts, {'parse': read_seconds, 'detect': time.perf_counter() - start - read_seconds}
+
+
+def _warm_up_worker():
+    # Compile the ruleset and import parser libraries before the first job arrives
+    get_ruleset()
+    from . import document_parser  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ProcessingExecutor:
+    """Runs parsing and detection off the event loop.
+
+    In-flight jobs are capped by a semaphore, so extra uploads wait their turn
+    instead of piling onto the pool. Each job has a timeout. A timed-out job
+    in a process pool still runs to completion in its worker, because
+    ProcessPoolExecutor cannot kill a single task, but the request is released.
+    """
+
+    def __init__(self, mode: str = PROCESSING_MODE, workers: int = PROCESSING_WORKERS,
+                 timeout: float = PROCESSING_TIMEOUT, max_inflight: int = MAX_INFLIGHT_JOBS):
+        if mode not in ('inline', 'thread', 'process'):
+            raise ValueError(f"Unknown processing mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.timeout = timeout
+        self.max_inflight = max_inflight
+        self._pool: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        if self._pool is not None or self.mode == 'inline':
+            return
+        if self.mode == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up_worker)
+            # Workers are spawned on demand; submit one task per worker so they all start now
+            pids = {future.result() for future in [self._pool.submit(_ping) for _ in range(self.workers)]}
+            logger.info(f"Started {len(pids)} processing worker processes")
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='processing')
+            _warm_up_worker()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, func: Callable, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+
+        async with self._semaphore:
+            if self.mode == 'inline':
+                return func(*args)
+
+            self.start()
+            loop = asyncio.get_running_loop()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(self._pool, func, *args), self.timeout)
+            except asyncio.TimeoutError:
+                raise ProcessingTimeout(f"Processing did not finish within {self.timeout:g} seconds")
+
+
+_executor = ProcessingExecutor()
+
+
+def get_executor() -> ProcessingExecutor:
+    return _executor
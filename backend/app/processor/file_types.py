@@ -0,0 +1,65 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import os
+
+# Leading bytes of an upload that content sniffing looks at
+SNIFF_BYTES = int(os.getenv('SNIFF_BYTES', 8192))
+
+
+@dataclass(frozen=True)
+class FileType:
+    mime_type: str
+    extensions: Tuple[str, ...]
+    # Suffix of the DocumentParser method that extracts the text
+    parser: str
+    # Text can be read incrementally instead of parsed whole
+    streamable: bool = False
+
+
+# Single dispatch table for upload validation and parsing
+FILE_TYPES: Dict[str, FileType] = {file_type.mime_type: file_type for file_type in [
+    FileType('application/pdf', ('.pdf',), 'pdf'),
+    FileType('application/msword', ('.doc',), 'word'),
+    FileType('application/vnd.openxmlformats-officedocument.wordprocessingml.document', ('.docx',), 'word'),
+    FileType('text/plain', ('.txt',), 'text', streamable=True),
+    FileType('image/png', ('.png',), 'image'),
+    FileType('image/jpeg', ('.jpg', '.jpeg'), 'image'),
+    FileType('image/tiff', ('.tif', '.tiff'), 'image'),
+    FileType('image/bmp', ('.bmp',), 'image')
+]}
+
+ALLOWED_MIME_TYPES: List[str] = list(FILE_TYPES)
+
+
+class UnsupportedFileType(ValueError):
+    def __init__(self, mime_type: str):
+        super().__init__(f"File type {mime_type} not allowed. Allowed types: {ALLOWED_MIME_TYPES}")
+        self.mime_type = mime_type
+
+
+def sniff_file_type(header: bytes) -> FileType:
+    """File type from the leading bytes of a file's content, regardless of its name"""
+    # libmagic is only needed once an upload arrives, not at startup
+    import magic
+    mime_type = magic.from_buffer(header[:SNIFF_BYTES], mime=True)
+    if mime_type not in FILE_TYPES:
+        raise UnsupportedFileType(mime_type)
+    return FILE_TYPES[mime_type]
+
+
+def sniff_path(file_path: str) -> FileType:
+    with open(file_path, 'rb') as f:
+        return sniff_file_type(f.read(SNIFF_BYTES))
+
+
+def resolve_file_type(file_path: str, mime_type: Optional[str] = None) -> FileType:
+    """The sniffed type when known; otherwise the type the file's extension stands for"""
+    if mime_type is not None:
+        if mime_type not in FILE_TYPES:
+            raise UnsupportedFileType(mime_type)
+        return FILE_TYPES[mime_type]
+    extension = os.path.splitext(file_path)[1].lower()
+    for file_type in FILE_TYPES.values():
+        if extension in file_type.extensions:
+            return file_type
+    raise ValueError(f"Unsupported file type: {extension}")
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import re
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    group: str
+    label: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """Case-insensitive multi-keyword matcher built once from grouped vocabularies.
+
+    All keywords are merged into a single trie which is compiled into one
+    regular expression, so a document is scanned in a single pass by the C
+    regex engine instead of once per keyword. Every occurrence is reported
+    with its category and offset, including overlapping ones ('delay' inside
+    'delayed'), the same output an Aho-Corasick automaton would produce.
+    """
+
+    def __init__(self, vocabularies: Dict[str, Dict[str, Iterable[str]]]):
+        self._categories: Dict[str, List[Tuple[str, str]]] = {}
+        for group, labels in vocabularies.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    categories = self._categories.setdefault(keyword.lower(), [])
+                    if (group, label) not in categories:
+                        categories.append((group, label))
+
+        keywords = sorted(self._categories)
+        # A lookahead match reports the longest keyword starting at a position;
+        # shorter keywords sharing that start are recovered from this table.
+        self._prefixes: Dict[str, List[str]] = {
+            keyword: [other for other in keywords if other != keyword and keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+        trie: Dict[str, dict] = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        source = '(?=(%s))' % self._trie_to_regex(trie) if keywords else '(?!)'
+        self._pattern = re.compile(source)
+        self._pattern_ignorecase = re.compile(source, re.IGNORECASE)
+
+    @property
+    def keywords(self) -> List[str]:
+        return list(self._categories)
+
+    @property
+    def max_keyword_length(self) -> int:
+        return max(map(len, self._categories), default=0)
+
+    def _trie_to_regex(self, node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + self._trie_to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+        if '' in node:
+            # Greedy optional so the longest keyword at a position wins
+            body = '(?:%s)?' % body
+        return body
+
+    def iter_hits(self, text: str, pos: int = 0, endpos: Optional[int] = None, base: int = 0) -> Iterator[KeywordHit]:
+        """Yield every keyword occurrence in text, in offset order.
+
+        Only occurrences starting in [pos, endpos) are reported, though a
+        keyword may extend past endpos. Offsets are shifted by base, for
+        text that is a window of a larger document.
+        """
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self._pattern.finditer(lowered, pos)
+        else:
+            # Some characters change length when lower-cased; match on the
+            # original text so offsets stay valid.
+            matches = self._pattern_ignorecase.finditer(text, pos)
+
+        for match in matches:
+            start = match.start()
+            if endpos is not None and start >= endpos:
+                break
+            found = match.group(1).lower()
+            if found not in self._categories:
+                continue
+            for keyword in self._prefixes[found] + [found]:
+                for group, label in self._categories[keyword]:
+                    yield KeywordHit(keyword, group, label, base + start, base + start + len(keyword))
+
+    def iter_hits_stream(self, chunks: Iterable[str], context: int = 0) -> Iterator[Tuple[KeywordHit, str, int]]:
+        """Hits of a chunked text, each with the buffer it was found in and the buffer's offset.
+
+        A hit is only reported once the buffer holds a full keyword length and
+        `context` characters past its start, so keywords (and context windows)
+        crossing a chunk boundary come out exactly as in one pass; the buffer
+        keeps `context` characters behind the next unreported position.
+        """
+        # One character behind keeps word boundaries correct with no context at all
+        keep = max(context, 1)
+        lookahead = self.max_keyword_length + keep
+        buffer, base, emit_from = '', 0, 0
+        for chunk in chunks:
+            buffer += chunk
+            emit_to = base + len(buffer) - lookahead
+            if emit_to <= emit_from:
+                continue
+            for hit in self.iter_hits(buffer, emit_from - base, emit_to - base, base):
+                yield hit, buffer, base
+            emit_from = emit_to
+            keep_from = max(emit_from - keep, base)
+            buffer, base = buffer[keep_from - base:], keep_from
+        for hit in self.iter_hits(buffer, emit_from - base, None, base):
+            yield hit, buffer, base
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        return list(self.iter_hits(text))
+
@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import hashlib
+import logging
+import os
+
+from ..services.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+OCR_ENABLED = os.getenv('OCR_ENABLED', 'true').lower() == 'true'
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+OCR_LANG = os.getenv('OCR_LANG', 'eng')
+# Pages are rendered at OCR_DPI, but never larger than OCR_MAX_DIMENSION pixels on the long side
+OCR_DPI = int(os.getenv('OCR_DPI', 200))
+OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', 2000))
+# A page with fewer extracted characters than this is treated as scanned
+OCR_MIN_TEXT_CHARS = int(os.getenv('OCR_MIN_TEXT_CHARS', 16))
+OCR_CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', 512))
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR')
+
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp']
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+_ocr_cache = ResultCache(max_entries=OCR_CACHE_SIZE, cache_dir=OCR_CACHE_DIR)
+
+
+def needs_ocr(text: str) -> bool:
+    """Text-layer check: True when a page has no usable embedded text"""
+    return len(text.strip()) < OCR_MIN_TEXT_CHARS
+
+
+def normalize_image(image):
+    """Grayscale, downsample to OCR_MAX_DIMENSION and stretch contrast"""
+    from PIL import Image, ImageOps
+    image = ImageOps.exif_transpose(image).convert('L')
+    if max(image.size) > OCR_MAX_DIMENSION:
+        image.thumbnail((OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.LANCZOS)
+    return ImageOps.autocontrast(image)
+
+
+def ocr_image(image) -> str:
+    """OCR an already normalized image; runs in the OCR worker processes"""
+    import pytesseract
+    return pytesseract.image_to_string(image, lang=OCR_LANG)
+
+
+def _cache_key(image) -> str:
+    page_hash = hashlib.sha256(f"{image.mode}{image.size}".encode() + image.tobytes()).hexdigest()
+    return ResultCache.make_key(page_hash, f"{OCR_LANG}-{OCR_MAX_DIMENSION}")
+
+
+def _get_ocr_pool() -> Optional[ProcessPoolExecutor]:
+    global _ocr_pool
+    # Worker processes (e.g. PROCESSING_MODE=process) OCR sequentially rather than nesting pools
+    if OCR_WORKERS <= 1 or multiprocessing.parent_process() is not None:
+        return None
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+        return _ocr_pool
+
+
+def ocr_images(images: Sequence) -> List[str]:
+    """OCR normalized images, reusing cached text and spreading the rest across the pool"""
+    keys = [_cache_key(image) for image in images]
+    texts: List[Optional[str]] = []
+    for key in keys:
+        cached = _ocr_cache.get(key)
+        texts.append(cached['text'] if cached is not None else None)
+
+    missing = [index for index, text in enumerate(texts) if text is None]
+    pool = _get_ocr_pool() if len(missing) > 1 else None
+    if pool is not None:
+        futures = {index: pool.submit(ocr_image, images[index]) for index in missing}
+        results = {index: future.result() for index, future in futures.items()}
+    else:
+        results = {index: ocr_image(images[index]) for index in missing}
+
+    for index, text in results.items():
+        _ocr_cache.put(keys[index], {'text': text})
+        texts[index] = text
+    return texts
+
+
+def rasterize_pdf_pages(file_path: str, page_indices: Sequence[int]) -> Dict[int, object]:
+    """Render the given pages straight at OCR resolution and normalize them"""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        images = {}
+        for index in page_indices:
+            page = pdf[index]
+            width, height = page.get_size()
+            # Render at the target size instead of rendering large and shrinking afterwards
+            scale = min(OCR_DPI / 72, OCR_MAX_DIMENSION / max(width, height))
+            images[index] = normalize_image(page.render(scale=scale).to_pil())
+            page.close()
+        return images
+    finally:
+        pdf.close()
+
+
+def ocr_pdf_pages(file_path: str, pages: List[str]) -> List[str]:
+    """Replace the text of scanned pages with OCR output; pages with a text layer are kept as is"""
+    scanned = [index for index, text in enumerate(pages) if needs_ocr(text)]
+    if not scanned or not OCR_ENABLED:
+        return pages
+
+    try:
+        images = rasterize_pdf_pages(file_path, scanned)
+        texts = ocr_images([images[index] for index in scanned])
+    except (ImportError, OSError) as e:
+        # Missing pypdfium2/pytesseract or tesseract binary
+        logger.error(f"OCR unavailable, keeping the text layer of {file_path}: {str(e)}")
+        return pages
+
+    pages = list(pages)
+    for index, text in zip(scanned, texts):
+        pages[index] = text
+    return pages
+
+
+def ocr_image_file(file_path: str) -> str:
+    from PIL import Image
+    with Image.open(file_path) as image:
+        return ocr_images([normalize_image(image)])[0]
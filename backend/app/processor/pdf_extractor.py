@@ -0,0 +1,75 @@
+from typing import Iterator, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import os
+
+# PyPDF2 is the only PDF text backend; every PDF reader in the project goes through this module
+import PyPDF2
+
+from .ocr import ocr_pdf_pages
+
+# Page-level parallelism is off unless PDF_PAGE_WORKERS is above 1
+PDF_PAGE_WORKERS = int(os.getenv('PDF_PAGE_WORKERS', 0))
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 16))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 64))
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def page_count(file_path: str) -> int:
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def iter_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page in [start, stop) one at a time.
+
+    Pages without a text layer yield an empty string. Stopping early, for
+    example with itertools.islice, skips extracting the remaining pages.
+    """
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        total = len(reader.pages)
+        stop = total if stop is None else min(stop, total)
+        for index in range(start, stop):
+            yield reader.pages[index].extract_text() or ''
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    return list(iter_pdf_pages(file_path, start, stop))
+
+
+def _get_page_pool() -> Optional[ProcessPoolExecutor]:
+    global _page_pool
+    # Worker processes (e.g. PROCESSING_MODE=process) extract sequentially rather than nesting pools
+    if PDF_PAGE_WORKERS <= 1 or multiprocessing.parent_process() is not None:
+        return None
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS)
+        return _page_pool
+
+
+def extract_pdf_text(file_path: str, max_pages: Optional[int] = None) -> str:
+    """Text of the first max_pages pages (all by default), each followed by a newline.
+
+    Long documents are split into page ranges extracted across a process pool
+    when PDF_PAGE_WORKERS is configured. Pages without a text layer are OCRed.
+    """
+    pages = None
+    pool = _get_page_pool()
+    if pool is not None:
+        total = page_count(file_path)
+        stop = total if max_pages is None else min(max_pages, total)
+        if stop >= PDF_PARALLEL_MIN_PAGES:
+            futures = [
+                pool.submit(extract_page_range, file_path, start, min(start + PDF_PAGES_PER_TASK, stop))
+                for start in range(0, stop, PDF_PAGES_PER_TASK)
+            ]
+            pages = [page for future in futures for page in future.result()]
+
+    if pages is None:
+        pages = list(iter_pdf_pages(file_path, 0, max_pages))
+    return ''.join(page + '\n' for page in ocr_pdf_pages(file_path, pages))
@@ -0,0 +1,174 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import threading
+import hashlib
+import logging
+import json
+import time
+import os
+
+from .keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Single source of department routing, alert vocabularies and recipients
+RULESET_FILE = os.getenv('RULESET_FILE', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'ruleset.json'))
+# How often the file is checked for changes; 0 checks on every access
+RULESET_CHECK_INTERVAL = float(os.getenv('RULESET_CHECK_INTERVAL', 2))
+
+
+@dataclass
+class Department:
+    id: str
+    name: str
+    tag: str
+    emails: List[str] = field(default_factory=list)
+    # Vocabulary of the backend AlertDetector
+    keywords: List[str] = field(default_factory=list)
+    # Vocabulary of the upload scan in the root app
+    scan_keywords: List[str] = field(default_factory=list)
+
+
+class Ruleset:
+    """One parsed and compiled version of the ruleset file.
+
+    Instances are never modified after construction, so a reference taken at
+    the start of a job stays consistent even if the file is reloaded meanwhile.
+    """
+
+    def __init__(self, data: Dict):
+        try:
+            self.revision = data['version']
+            self.departments: Dict[str, Department] = {
+                dept_id: Department(
+                    id=dept_id,
+                    name=dept['name'],
+                    tag=dept.get('tag', dept_id.title()),
+                    emails=list(dept.get('emails', [])),
+                    keywords=list(dept.get('keywords', [])),
+                    scan_keywords=list(dept.get('scan_keywords', []))
+                ) for dept_id, dept in data['departments'].items()
+            }
+            self.urgency: Dict[str, List[str]] = {label: list(words) for label, words in data['urgency'].items()}
+            self.scan_severity: Dict[str, List[str]] = {
+                label: list(words) for label, words in data['scan_severity'].items()
+            }
+            self.alert_keywords: List[str] = list(data.get('alert_keywords', []))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid ruleset: {type(e).__name__} {str(e)}") from e
+
+        # The declared revision is for people; the digest changes with any edit, so
+        # caches keyed on the version never survive a change to the rules
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:8]
+        self.version = f"v{self.revision}-{digest}"
+        self.matcher = KeywordMatcher(self.vocabularies)
+
+    @property
+    def vocabularies(self) -> Dict[str, Dict[str, List[str]]]:
+        return {
+            'department': {d.id: d.keywords for d in self.departments.values() if d.keywords},
+            'urgency': self.urgency,
+            'severity': self.scan_severity,
+            'scan_department': {d.tag: d.scan_keywords for d in self.departments.values() if d.scan_keywords}
+        }
+
+    @property
+    def detector_departments(self) -> List[str]:
+        return [d.id for d in self.departments.values() if d.keywords]
+
+    @property
+    def scan_departments(self) -> List[str]:
+        return [d.tag for d in self.departments.values() if d.scan_keywords]
+
+    def department_by_tag(self, tag: str) -> Optional[Department]:
+        for dept in self.departments.values():
+            if dept.tag == tag:
+                return dept
+        return None
+
+    @classmethod
+    def load(cls, path: str) -> 'Ruleset':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+
+class RulesetStore:
+    """Holds the active ruleset and swaps in a new one when the file changes.
+
+    The file is stat'ed at most once per check interval. A changed file is
+    parsed and compiled before the reference is replaced, so readers see either
+    the old ruleset or the new one, never a mix. A file that fails to load is
+    logged and the previous ruleset stays active. Each worker process has its
+    own store and picks up changes on its own.
+
+    Listeners are called with the new ruleset after a change of version, on
+    the thread that noticed it, so they must not block.
+    """
+
+    def __init__(self, path: str = RULESET_FILE, check_interval: float = RULESET_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._ruleset: Optional[Ruleset] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Ruleset], None]] = []
+
+    def add_listener(self, listener: Callable[[Ruleset], None]):
+        self._listeners.append(listener)
+
+    def get(self) -> Ruleset:
+        ruleset = self._ruleset
+        if ruleset is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return ruleset
+        return self.reload()
+
+    def reload(self, force: bool = False) -> Ruleset:
+        changed = False
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if force or self._ruleset is None or stamp != self._stamp:
+                    ruleset = Ruleset.load(self.path)
+                    if self._ruleset is None or ruleset.version != self._ruleset.version:
+                        logger.info(f"Loaded ruleset {ruleset.version} from {self.path}")
+                        changed = self._ruleset is not None
+                    self._ruleset, self._stamp = ruleset, stamp
+            except (OSError, ValueError) as e:
+                if self._ruleset is None:
+                    raise
+                logger.error(f"Failed to reload ruleset, keeping {self._ruleset.version}: {str(e)}")
+            ruleset = self._ruleset
+
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener(ruleset)
+                except Exception as e:
+                    logger.error(f"Ruleset listener failed: {str(e)}")
+        return ruleset
+
+
+_store = RulesetStore()
+
+
+def get_ruleset() -> Ruleset:
+    return _store.get()
+
+
+def on_ruleset_change(listener: Callable[[Ruleset], None]):
+    """Call listener with the new ruleset whenever a reload changes its version"""
+    _store.add_listener(listener)
+
+
+def reload_ruleset() -> Ruleset:
+    """Load the ruleset file now instead of waiting for the next check"""
+    return _store.reload(force=True)
+
+
+def get_default_matcher() -> KeywordMatcher:
+    """Matcher compiled from the active ruleset"""
+    return get_ruleset().matcher
@@ -1,3 +1,24 @@
 from .department_service import DepartmentService
+from .accuracy_service import AccuracyService, get_accuracy_service
+from .history_store import HistoryStore, SQLiteHistoryStore, JsonlHistoryStore, open_history_store
+from .result_cache import ResultCache, get_result_cache
+from .job_queue import JobQueue, JobWorkerPool
+from .summarizer import SummarizationService, get_summarization_service
+from .search_index import SearchIndex
 
-__all__ = ['DepartmentService']
\ No newline at end of file
+__all__ = [
+    'DepartmentService',
+    'AccuracyService',
+    'get_accuracy_service',
+    'HistoryStore',
+    'SQLiteHistoryStore',
+    'JsonlHistoryStore',
+    'open_history_store',
+    'ResultCache',
+    'get_result_cache',
+    'JobQueue',
+    'JobWorkerPool',
+    'SummarizationService',
+    'get_summarization_service',
+    'SearchIndex'
+]
\ No newline at end of file
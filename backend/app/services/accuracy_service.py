@@ -0,0 +1,125 @@
+from typing import Dict, Optional
+from datetime import datetime
+import threading
+import logging
+import sys
+import os
+
+from .result_cache import ResultCache
+from ..processor.ruleset import get_ruleset, on_ruleset_change
+
+logger = logging.getLogger(__name__)
+
+# Make the backend/tests package importable regardless of the working directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class AccuracyService:
+    """Keeps the accuracy metrics of the active ruleset in memory.
+
+    The accuracy suite is evaluated once per test corpus and ruleset version,
+    and the result is reused for every processed document. The tester keeps
+    full reports under the same key, so `refresh` only re-runs the suite
+    when asked to or when either one changed.
+
+    Request handlers read the snapshot with `get_snapshot`, which never
+    evaluates on the caller's thread: a missing or stale snapshot is refreshed
+    on a background thread, and a ruleset reload starts that refresh itself.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[Dict] = None
+        self._tester = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        on_ruleset_change(lambda ruleset: self.refresh_in_background())
+
+    def _get_tester(self):
+        if self._tester is None:
+            if BACKEND_DIR not in sys.path:
+                sys.path.append(BACKEND_DIR)
+            from tests.accuracy_tester import AccuracyTester
+            self._tester = AccuracyTester()
+        return self._tester
+
+    def get_snapshot(self) -> Optional[Dict]:
+        """Latest snapshot without blocking, None before the first evaluation has finished.
+
+        A snapshot of another corpus or ruleset is still returned, while a
+        refresh runs in the background.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or self._tester is None or snapshot['ruleset_version'] != get_ruleset().version:
+            # Loading the tester imports NumPy; leave that to the background thread as well
+            self.refresh_in_background()
+            return snapshot
+        try:
+            if snapshot['cache_key'] != self._tester.cache_key():
+                self.refresh_in_background()
+        except OSError as e:
+            logger.error(f"Failed to check accuracy test cases: {str(e)}")
+        return snapshot
+
+    def refresh_in_background(self):
+        """Bring the snapshot up to date on a background thread, unless a refresh is already running"""
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name='accuracy-refresh', daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.ensure_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to compute accuracy snapshot: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def ensure_snapshot(self) -> Dict:
+        """Snapshot for the current corpus and ruleset, evaluating the suite if needed; blocks"""
+        key = self._get_tester().cache_key()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot['cache_key'] == key:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot['cache_key'] == key:
+                return snapshot
+            self._evaluate(use_cache=True)
+            return self._snapshot
+
+    def refresh(self, force: bool = False) -> Dict:
+        """Full report for the current corpus and ruleset; force re-runs the suite even if cached"""
+        with self._lock:
+            return self._evaluate(use_cache=not force)
+
+    def render_chart(self, report: Dict):
+        try:
+            self._get_tester().render_chart(report)
+        except Exception as e:
+            logger.error(f"Failed to render accuracy chart: {str(e)}")
+
+    def _evaluate(self, use_cache: bool) -> Dict:
+        report = self._get_tester().run_accuracy_test(render_chart=False, use_cache=use_cache)
+        self._snapshot = {
+            'cache_key': ResultCache.make_key(report['corpus_hash'], report['ruleset_version']),
+            'ruleset_version': report['ruleset_version'],
+            'metrics': report['metrics'],
+            'overall_accuracy': report['overall_accuracy'],
+            'evaluated_at': datetime.now().isoformat()
+        }
+        logger.info(f"Accuracy snapshot for ruleset {report['ruleset_version']} over {report['case_count']} cases: "
+                    f"{report['overall_accuracy']:.2%}")
+        return report
+
+
+_accuracy_service = AccuracyService()
+
+
+def get_accuracy_service() -> AccuracyService:
+    return _accuracy_service
@@ -1,39 +1,22 @@
 from typing import Dict, List
-from dataclasses import dataclass
 
-@dataclass
-class Department:
-    id: str
-    name: str
-    email: str
-    keywords: List[str]
+from ..processor.ruleset import Department, get_ruleset
 
 class DepartmentService:
-    def __init__(self):
-        self.departments = {
-            'safety': Department(
-                id='safety',
-                name='Safety Department',
-                email='safety@company.com',
-                keywords=['fire', 'hazard', 'chemical', 'emergency']
-            ),
-            'maintenance': Department(
-                id='maintenance',
-                name='Maintenance Department',
-                email='maintenance@company.com',
-                keywords=['repair', 'breakdown', 'delay']
-            ),
-            'hr': Department(
-                id='hr',
-                name='Human Resources',
-                email='hr@company.com',
-                keywords=['employee', 'personnel', 'staff']
-            )
-        }
+    """Department lookups against the active ruleset"""
+
+    @property
+    def departments(self) -> Dict[str, Department]:
+        return get_ruleset().departments
 
     def get_relevant_departments(self, alerts: List[Dict]) -> List[Department]:
-        relevant_depts = []
+        departments = self.departments
+        relevant_depts = {}
         for alert in alerts:
-            if dept := self.departments.get(alert['department']):
-                relevant_depts.append(dept)
-        return list(set(relevant_depts))
\ No newline at end of file
+            if dept := departments.get(alert['department']):
+                relevant_depts[dept.id] = dept
+        return list(relevant_depts.values())
+
+    def get_recipients(self, department_id: str) -> List[str]:
+        dept = self.departments.get(department_id)
+        return list(dept.emails) if dept else []
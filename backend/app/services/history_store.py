@@ -0,0 +1,560 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import threading
+import bisect
+import base64
+import sqlite3
+import logging
+import uuid
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+UNRANKED = len(SEVERITY_RANK)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def severity_rank(severity: Optional[str]) -> int:
+    return SEVERITY_RANK.get((severity or '').lower(), UNRANKED)
+
+
+def filter_ranks(severities: Sequence[str]) -> List[int]:
+    """Ranks of the severities in a query filter; unknown severities are an error, not unranked"""
+    unknown = [severity for severity in severities if (severity or '').lower() not in SEVERITY_RANK]
+    if unknown:
+        raise ValueError(f"Unknown severity: {', '.join(unknown)}. Expected one of {list(SEVERITY_RANK)}")
+    return sorted({severity_rank(severity) for severity in severities})
+
+
+def timestamp_to_us(value) -> int:
+    """Microseconds since the epoch (UTC) for an ISO-style timestamp or datetime, 0 if unparseable.
+
+    Naive values are local time, as written by datetime.now(), so stored
+    timestamps and timezone-aware query bounds compare on the same clock.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return 0
+    if not isinstance(value, datetime):
+        return 0
+    try:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+        # Outside the range the platform can convert from local time
+        return 0
+    return (value - EPOCH) // datetime.resolution
+
+
+def document_departments(document: Dict) -> List[str]:
+    """Lower-cased department names and ids from both history formats"""
+    names = set()
+    for dept in document.get('departments') or []:
+        # Entries without alerts, such as duplicates, only carry their departments
+        for name in (dept.get('name'), dept.get('id')) if isinstance(dept, dict) else (dept,):
+            if name:
+                names.add(str(name).lower())
+    for alert in document.get('alerts') or []:
+        if isinstance(alert, dict) and alert.get('department'):
+            names.add(str(alert['department']).lower())
+    return sorted(names)
+
+
+def document_keywords(document: Dict) -> List[str]:
+    """Lower-cased keywords from both history formats"""
+    keywords = {str(kw).lower() for kw in document.get('keywords') or []}
+    for entry in (document.get('alerts') or []) + (document.get('departments') or []):
+        if isinstance(entry, dict):
+            keywords.update(str(kw).lower() for kw in entry.get('keywords') or [])
+            if entry.get('keyword'):
+                keywords.add(str(entry['keyword']).lower())
+    return sorted(keywords)
+
+
+def encode_cursor(rank: int, created_us: int, seq: int) -> str:
+    raw = json.dumps([rank, created_us, seq]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, created_us, seq = json.loads(raw)
+        return int(rank), int(created_us), int(seq)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class HistoryStore(ABC):
+    """Storage backend for processed document history.
+
+    Every write is a single O(1) append or upsert, so saving a document never
+    rewrites the existing history.
+    """
+
+    @abstractmethod
+    def put(self, document: Dict, key: Optional[str] = None) -> str:
+        """Store a document and return its key. An existing key is replaced."""
+
+    @abstractmethod
+    def put_many(self, documents: Sequence[Dict], keys: Optional[Sequence[Optional[str]]] = None,
+                 if_empty: bool = False) -> List[str]:
+        """Store several documents in one write.
+
+        With `if_empty`, nothing is written unless the store is still empty,
+        which lets concurrent workers race on a one-time import safely.
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    def list_documents(self) -> List[Dict]:
+        """All documents in insertion order"""
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    @abstractmethod
+    def query(self, limit: int = 50, cursor: Optional[str] = None, severities: Optional[Sequence[str]] = None,
+              department: Optional[str] = None, keyword: Optional[str] = None,
+              since=None, until=None) -> Tuple[List[Dict], Optional[str]]:
+        """One page of documents, most severe first and newest first within a severity.
+
+        Returns the page and an opaque cursor for the next page, or None when
+        there are no more results. `since` and `until` are inclusive bounds on
+        the document timestamp.
+        """
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def new_key() -> str:
+        return uuid.uuid4().hex
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """History kept in an embedded SQLite database in WAL mode.
+
+    SQLite serialises writers across processes, so concurrent uploads handled
+    by different workers cannot lose each other's writes.
+    """
+
+    # Bumped whenever the derived listing columns are computed differently
+    SCHEMA_VERSION = 2
+
+    # Filter tables carry the listing order, so a filtered page is one index range scan
+    # of matching entries instead of a scan of the whole history
+    FILTER_TABLES = [
+        """
+        CREATE TABLE IF NOT EXISTS document_departments (
+            doc_id INTEGER NOT NULL,
+            department TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            created_us INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_document_departments_order "
+        "ON document_departments(department, priority, created_us, doc_id)",
+        "CREATE INDEX IF NOT EXISTS idx_document_departments_doc ON document_departments(doc_id, department)",
+        """
+        CREATE TABLE IF NOT EXISTS document_keywords (
+            doc_id INTEGER NOT NULL,
+            keyword TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            created_us INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_document_keywords_order "
+        "ON document_keywords(keyword, priority, created_us, doc_id)",
+        "CREATE INDEX IF NOT EXISTS idx_document_keywords_doc ON document_keywords(doc_id, keyword)"
+    ]
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doc_key TEXT NOT NULL UNIQUE,
+                file_name TEXT,
+                timestamp TEXT,
+                highest_severity TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_file_name ON documents(file_name);
+        """)
+        self._upgrade_schema()
+        # priority is UNRANKED - severity rank so the listing order is a single descending index scan
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_order ON documents(priority, created_us, id)"
+        )
+
+    def _upgrade_schema(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if 'priority' not in columns:
+            # Stores created before the listing indexes existed
+            self._conn.execute("ALTER TABLE documents ADD COLUMN priority INTEGER")
+            self._conn.execute("ALTER TABLE documents ADD COLUMN created_us INTEGER")
+        # IMMEDIATE so only one process upgrades; the others see the new version
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 2:
+                # Version 2: the filter tables gained the listing columns; they are derived, so rebuild them
+                self._conn.execute("DROP TABLE IF EXISTS document_departments")
+                self._conn.execute("DROP TABLE IF EXISTS document_keywords")
+            for statement in self.FILTER_TABLES:
+                self._conn.execute(statement)
+            if version < self.SCHEMA_VERSION:
+                # Version 1: created_us is UTC rather than the naive local timestamp
+                for doc_id, data in self._conn.execute("SELECT id, data FROM documents").fetchall():
+                    self._index_document(doc_id, json.loads(data))
+                self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _index_document(self, doc_id: int, document: Dict):
+        priority = UNRANKED - severity_rank(document.get('highest_severity'))
+        created_us = timestamp_to_us(document.get('timestamp'))
+        self._conn.execute(
+            "UPDATE documents SET priority = ?, created_us = ? WHERE id = ?",
+            (priority, created_us, doc_id)
+        )
+        self._conn.execute("DELETE FROM document_departments WHERE doc_id = ?", (doc_id,))
+        self._conn.execute("DELETE FROM document_keywords WHERE doc_id = ?", (doc_id,))
+        self._conn.executemany(
+            "INSERT INTO document_departments (doc_id, department, priority, created_us) VALUES (?, ?, ?, ?)",
+            [(doc_id, dept, priority, created_us) for dept in document_departments(document)]
+        )
+        self._conn.executemany(
+            "INSERT INTO document_keywords (doc_id, keyword, priority, created_us) VALUES (?, ?, ?, ?)",
+            [(doc_id, kw, priority, created_us) for kw in document_keywords(document)]
+        )
+
+    def _insert(self, document: Dict, key: str):
+        self._conn.execute(
+            """
+            INSERT INTO documents (doc_key, file_name, timestamp, highest_severity, data)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(doc_key) DO UPDATE SET
+                file_name = excluded.file_name,
+                timestamp = excluded.timestamp,
+                highest_severity = excluded.highest_severity,
+                data = excluded.data
+            """,
+            (key, document.get('file_name'), document.get('timestamp'),
+             document.get('highest_severity'), json.dumps(document, ensure_ascii=False))
+        )
+        doc_id = self._conn.execute("SELECT id FROM documents WHERE doc_key = ?", (key,)).fetchone()[0]
+        self._index_document(doc_id, document)
+
+    def put(self, document: Dict, key: Optional[str] = None) -> str:
+        return self.put_many([document], [key])[0]
+
+    def put_many(self, documents: Sequence[Dict], keys: Optional[Sequence[Optional[str]]] = None,
+                 if_empty: bool = False) -> List[str]:
+        keys = [key or self.new_key() for key in (keys or [None] * len(documents))]
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so the emptiness check and inserts are atomic
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if if_empty and self._conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+                    self._conn.execute("ROLLBACK")
+                    return []
+                for document, key in zip(documents, keys):
+                    self._insert(document, key)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return keys
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM documents WHERE doc_key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_documents(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM documents ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def query(self, limit: int = 50, cursor: Optional[str] = None, severities: Optional[Sequence[str]] = None,
+              department: Optional[str] = None, keyword: Optional[str] = None,
+              since=None, until=None) -> Tuple[List[Dict], Optional[str]]:
+        ranks = filter_ranks(severities) if severities else range(UNRANKED + 1)
+        after = None
+        if cursor:
+            rank, created_us, doc_id = decode_cursor(cursor)
+            after = (UNRANKED - rank, created_us, doc_id)
+
+        # The rarest kind of filter drives the scan; documents are joined back by id
+        if department:
+            source, order_id = "document_departments f CROSS JOIN documents d ON d.id = f.doc_id", "f.doc_id"
+            clauses, params = ["f.department = ?"], [department.lower()]
+        elif keyword:
+            source, order_id = "document_keywords f CROSS JOIN documents d ON d.id = f.doc_id", "f.doc_id"
+            clauses, params = ["f.keyword = ?"], [keyword.lower()]
+        else:
+            source, order_id = "documents f CROSS JOIN documents d ON d.id = f.id", "f.id"
+            clauses, params = [], []
+        if department and keyword:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM document_keywords k WHERE k.doc_id = d.id AND k.keyword = ?)"
+            )
+            params.append(keyword.lower())
+        if since is not None:
+            clauses.append("f.created_us >= ?")
+            params.append(timestamp_to_us(since))
+        if until is not None:
+            clauses.append("f.created_us <= ?")
+            params.append(timestamp_to_us(until))
+
+        # One index range per severity, most severe first, so time bounds are seeks rather than filters
+        rows = []
+        with self._lock:
+            for priority in sorted((UNRANKED - rank for rank in ranks), reverse=True):
+                if after is not None and priority > after[0]:
+                    continue
+                page_clauses, page_params = clauses + ["f.priority = ?"], params + [priority]
+                if after is not None and priority == after[0]:
+                    page_clauses.append(f"(f.created_us, {order_id}) < (?, ?)")
+                    page_params.extend(after[1:])
+                sql = (f"SELECT d.id, d.priority, d.created_us, d.data FROM {source} WHERE "
+                       + " AND ".join(page_clauses) + f" ORDER BY f.created_us DESC, {order_id} DESC LIMIT ?")
+                rows.extend(self._conn.execute(sql, page_params + [limit + 1 - len(rows)]).fetchall())
+                if len(rows) > limit:
+                    break
+
+        next_cursor = None
+        if len(rows) > limit:
+            doc_id, priority, created_us, _ = rows[limit - 1]
+            next_cursor = encode_cursor(UNRANKED - priority, created_us, doc_id)
+        return [json.loads(row[3]) for row in rows[:limit]], next_cursor
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JsonlHistoryStore(HistoryStore):
+    """Append-only JSON Lines log with an in-memory index.
+
+    Each write is one `O_APPEND` write of a single line followed by fsync. A
+    later line with the same key supersedes the earlier one. Lines appended by
+    other processes are picked up incrementally on the next read.
+
+    Listing is served from a sorted list of (severity rank, -timestamp, -seq,
+    key) tuples, so severity and time range filters are bisected rather than
+    scanned.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self._seq: Dict[str, int] = {}
+        self._sort_keys: Dict[str, Tuple] = {}
+        self._order: List[Tuple] = []
+        self._departments: Dict[str, set] = {}
+        self._keywords: Dict[str, set] = {}
+        self._offset = 0
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._refresh()
+
+    def _refresh(self):
+        # Only consume complete lines; a concurrent writer may be mid-append
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.error(f"Skipping corrupt history line in {self.path}")
+                continue
+            self._add(record['key'], record['document'])
+        self._offset += end
+
+    def _add(self, key: str, document: Dict):
+        if key in self._index:
+            old = self._sort_keys[key]
+            del self._order[bisect.bisect_left(self._order, old)]
+            old_document = self._index[key]
+            for dept in document_departments(old_document):
+                self._departments[dept].discard(key)
+            for kw in document_keywords(old_document):
+                self._keywords[kw].discard(key)
+        else:
+            self._seq[key] = len(self._seq) + 1
+
+        sort_key = (severity_rank(document.get('highest_severity')),
+                    -timestamp_to_us(document.get('timestamp')), -self._seq[key], key)
+        bisect.insort(self._order, sort_key)
+        self._sort_keys[key] = sort_key
+        self._index[key] = document
+        for dept in document_departments(document):
+            self._departments.setdefault(dept, set()).add(key)
+        for kw in document_keywords(document):
+            self._keywords.setdefault(kw, set()).add(key)
+
+    def _append(self, records: List[Dict]):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        os.write(self._fd, data.encode('utf-8'))
+        os.fsync(self._fd)
+        self._refresh()
+
+    def put(self, document: Dict, key: Optional[str] = None) -> str:
+        key = key or self.new_key()
+        with self._lock:
+            self._append([{'key': key, 'document': document}])
+        return key
+
+    def put_many(self, documents: Sequence[Dict], keys: Optional[Sequence[Optional[str]]] = None,
+                 if_empty: bool = False) -> List[str]:
+        keys = [key or self.new_key() for key in (keys or [None] * len(documents))]
+        with self._lock:
+            self._refresh()
+            if if_empty and self._index:
+                return []
+            self._append([{'key': key, 'document': document} for document, key in zip(documents, keys)])
+        return keys
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            return self._index.get(key)
+
+    def list_documents(self) -> List[Dict]:
+        with self._lock:
+            self._refresh()
+            return list(self._index.values())
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+    def query(self, limit: int = 50, cursor: Optional[str] = None, severities: Optional[Sequence[str]] = None,
+              department: Optional[str] = None, keyword: Optional[str] = None,
+              since=None, until=None) -> Tuple[List[Dict], Optional[str]]:
+        ranks = filter_ranks(severities) if severities else range(UNRANKED + 1)
+        cursor_key = None
+        if cursor:
+            rank, created_us, seq = decode_cursor(cursor)
+            cursor_key = (rank, -created_us, -seq + 1)
+
+        with self._lock:
+            self._refresh()
+            start = bisect.bisect_left(self._order, cursor_key) if cursor_key else 0
+            dept_keys = self._departments.get(department.lower(), set()) if department else None
+            keyword_keys = self._keywords.get(keyword.lower(), set()) if keyword else None
+
+            page = []
+            last = None
+            has_more = False
+            for rank in ranks:
+                lo = bisect.bisect_left(self._order, (rank, -timestamp_to_us(until)) if until is not None else (rank,))
+                hi = bisect.bisect_left(self._order, (rank, -timestamp_to_us(since) + 1) if since is not None else (rank + 1,))
+                for position in range(max(lo, start), hi):
+                    sort_key = self._order[position]
+                    key = sort_key[3]
+                    if dept_keys is not None and key not in dept_keys:
+                        continue
+                    if keyword_keys is not None and key not in keyword_keys:
+                        continue
+                    if len(page) == limit:
+                        has_more = True
+                        break
+                    page.append(self._index[key])
+                    last = sort_key
+                if has_more:
+                    break
+
+        next_cursor = encode_cursor(last[0], -last[1], -last[2]) if has_more else None
+        return page, next_cursor
+
+    def close(self):
+        with self._lock:
+            os.close(self._fd)
+
+
+HISTORY_BACKENDS = {
+    'sqlite': SQLiteHistoryStore,
+    'jsonl': JsonlHistoryStore
+}
+
+
+def open_history_store(path: str, backend: Optional[str] = None) -> HistoryStore:
+    """Open a history store, choosing the backend from the argument, HISTORY_BACKEND or the file extension"""
+    backend = backend or os.getenv('HISTORY_BACKEND')
+    if not backend:
+        backend = 'jsonl' if path.endswith('.jsonl') else 'sqlite'
+    if backend not in HISTORY_BACKENDS:
+        raise ValueError(f"Unknown history backend: {backend}")
+    return HISTORY_BACKENDS[backend](path)
+
+
+def migrate_json_history(json_path: str, store: HistoryStore, key_field: Optional[str] = None) -> int:
+    """One-time import of a legacy whole-file JSON history into an empty store.
+
+    Accepts both `{"documents": [...]}` and a bare list. Returns the number of
+    documents imported; nothing is imported when the store already has data.
+    """
+    if not os.path.exists(json_path) or store.count() > 0:
+        return 0
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    documents = data.get('documents', []) if isinstance(data, dict) else data
+    if not isinstance(documents, list):
+        return 0
+
+    documents = [document for document in documents if isinstance(document, dict)]
+    keys = [document.get(key_field) if key_field else None for document in documents]
+    imported = len(store.put_many(documents, keys, if_empty=True))
+    if not imported:
+        return 0
+
+    logger.info(f"Migrated {imported} documents from {json_path} to {store.path}")
+    return imported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate a legacy JSON document history into a history store")
+    parser.add_argument("json_path")
+    parser.add_argument("store_path")
+    parser.add_argument("--backend", choices=list(HISTORY_BACKENDS))
+    parser.add_argument("--key-field", help="Document field to use as the upsert key, e.g. file_name")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = open_history_store(args.store_path, args.backend)
+    count = migrate_json_history(args.json_path, store, args.key_field)
+    print(f"Migrated {count} documents into {args.store_path}")
+    store.close()
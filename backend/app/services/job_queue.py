@@ -0,0 +1,276 @@
+from typing import Awaitable, Callable, Collection, Dict, List, Optional, Set
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading
+import asyncio
+import sqlite3
+import logging
+import uuid
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+# Jobs left running this long (e.g. by a crashed worker) are queued again
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 600))
+# How often the worker pool looks for stale jobs
+JOB_SWEEP_INTERVAL = float(os.getenv('JOB_SWEEP_INTERVAL', 60))
+# Requeue every running job at start; only for single-process deployments
+JOB_RECOVER_RUNNING = os.getenv('JOB_RECOVER_RUNNING', 'false').lower() == 'true'
+
+
+class JobQueue:
+    """Durable FIFO job queue in SQLite, standing in for Redis on single-host deployments.
+
+    Jobs survive restarts. claim() is atomic across threads and processes, so
+    several workers can drain the same queue.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+        """)
+
+    def enqueue(self, payload: Dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, payload, created_at, updated_at) VALUES (?, 'queued', 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now)
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', stage = 'started', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (now, row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row['id']) if row is not None else None
+
+    def set_stage(self, job_id: str, stage: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?",
+                (stage, datetime.now().isoformat(), job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', stage = 'done', result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), datetime.now().isoformat(), job_id)
+            )
+
+    def fail(self, job_id: str, error: Dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(error, ensure_ascii=False), datetime.now().isoformat(), job_id)
+            )
+
+    def release(self, job_id: str):
+        """Put a running job back in the queue, e.g. on shutdown"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', updated_at = ? WHERE id = ? AND status = 'running'",
+                (datetime.now().isoformat(), job_id)
+            )
+
+    def requeue_stale(self, max_age: float = JOB_STALE_SECONDS, exclude: Collection[str] = ()) -> int:
+        """Queue running jobs not updated for max_age seconds again; max_age=0 requeues every running job.
+
+        Jobs in exclude are known to be alive and left alone.
+        """
+        now = datetime.now()
+        cutoff = (now - timedelta(seconds=max_age)).isoformat()
+        with self._lock:
+            cursor = self._conn.execute(
+                f"""
+                UPDATE jobs SET status = 'queued', stage = 'queued', updated_at = ?
+                WHERE status = 'running' AND updated_at <= ? AND id NOT IN ({', '.join('?' * len(exclude))})
+                """, [now.isoformat(), cutoff, *exclude]
+            )
+        return cursor.rowcount
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in ('payload', 'result', 'error'):
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+JobHandler = Callable[[Dict, Callable[[str], None]], Awaitable[Dict]]
+
+
+class JobWorkerPool:
+    """Background asyncio workers that drain a JobQueue.
+
+    The handler receives the job and a callback for reporting its current
+    stage. It returns the job result, or raises to mark the job failed.
+
+    Jobs a crashed process left running are queued again once they have been
+    stale for stale_after seconds; the pool sweeps for them every
+    sweep_interval seconds, so they are picked up without another restart.
+    With recover_running=True (only safe when no other process drains the
+    same queue), every running job is queued again at start.
+
+    Queue writes can wait up to the SQLite busy timeout while another process
+    holds the write lock, so they run on one background thread, never on the
+    event loop. Being a single thread, it also applies a job's stage updates
+    in the order they were reported.
+    """
+
+    def __init__(self, queue: JobQueue, handler: JobHandler, workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL, stale_after: float = JOB_STALE_SECONDS,
+                 sweep_interval: float = JOB_SWEEP_INTERVAL, recover_running: bool = JOB_RECOVER_RUNNING):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.sweep_interval = sweep_interval
+        self.recover_running = recover_running
+        self._running: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-queue')
+        # Created first, so the startup requeue is submitted before any claim
+        self._tasks = [asyncio.create_task(self._sweep())]
+        self._tasks.extend(asyncio.create_task(self._work(index)) for index in range(self.workers))
+
+    def notify(self):
+        """Wake idle workers instead of waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            # Lets queued writes such as releases finish before returning
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _call(self, func, *args):
+        # Shielded: once submitted, a write lands even if the awaiting task is cancelled
+        return await asyncio.shield(asyncio.get_running_loop().run_in_executor(self._executor, func, *args))
+
+    def _set_stage(self, job_id: str, stage: str):
+        # Called synchronously by handlers; the update is queued and not waited for
+        future = self._executor.submit(self.queue.set_stage, job_id, stage)
+        future.add_done_callback(lambda done: self._log_stage_error(job_id, done))
+
+    @staticmethod
+    def _log_stage_error(job_id: str, future: Future):
+        if future.exception() is not None:
+            logger.error(f"Failed to update stage of job {job_id}: {str(future.exception())}")
+
+    async def _requeue(self, max_age: float):
+        requeued = await self._call(self.queue.requeue_stale, max_age, list(self._running))
+        if requeued:
+            logger.info(f"Requeued {requeued} stale jobs")
+            self.notify()
+
+    async def _sweep(self):
+        max_age = 0 if self.recover_running else self.stale_after
+        while True:
+            try:
+                await self._requeue(max_age)
+            except Exception as e:
+                logger.error(f"Failed to requeue stale jobs: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+            max_age = self.stale_after
+
+    async def _claim(self) -> Optional[Dict]:
+        claim = asyncio.get_running_loop().run_in_executor(self._executor, self.queue.claim)
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # The claim still commits; hand the job straight back
+            job = await claim
+            if job is not None:
+                await self._call(self.queue.release, job['id'])
+            raise
+
+    async def _work(self, index: int):
+        while True:
+            # Clear before claiming so an enqueue that races the claim still wakes us
+            self._wakeup.clear()
+            job = await self._claim()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = job['id']
+            self._running.add(job_id)
+            try:
+                result = await self.handler(job, lambda stage: self._set_stage(job_id, stage))
+                await self._call(self.queue.complete, job_id, result)
+            except asyncio.CancelledError:
+                # Only touches jobs still running, so a completion that already landed stays
+                await self._call(self.queue.release, job_id)
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                await self._call(self.queue.fail, job_id, {
+                    'status_code': getattr(e, 'status_code', 500),
+                    'detail': getattr(e, 'detail', None) or str(e)
+                })
+            finally:
+                self._running.discard(job_id)
@@ -0,0 +1,96 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+import threading
+import logging
+import copy
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', 1024))
+# Optional on-disk tier; disabled unless a directory is configured
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+
+
+class ResultCache:
+    """Processing results keyed by content hash and ruleset version.
+
+    A bounded in-memory LRU sits in front of an optional directory of JSON
+    files. Entries evicted from memory survive on disk and are promoted back
+    on the next hit.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, cache_dir: Optional[str] = RESULT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, ruleset_version: str) -> str:
+        return f"{content_hash}:{ruleset_version}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                return copy.deepcopy(result)
+
+        result = self._read_disk(key)
+        if result is not None:
+            self._remember(key, result)
+            return copy.deepcopy(result)
+        return None
+
+    def put(self, key: str, result: Dict):
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        self._write_disk(key, result)
+
+    def _remember(self, key: str, result: Dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        name = key.replace(':', '-')
+        return os.path.join(self.cache_dir, name[:2], name + '.json')
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read cached result {path}: {str(e)}")
+            return None
+
+    def _write_disk(self, key: str, result: Dict):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = f"{path}.{os.getpid()}.tmp"
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(partial_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write cached result {path}: {str(e)}")
+
+
+_result_cache = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    return _result_cache
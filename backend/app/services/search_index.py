@@ -0,0 +1,199 @@
+from typing import Dict, List, Optional, Sequence
+import threading
+import sqlite3
+import logging
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Longer extracted text is truncated before indexing
+SEARCH_MAX_TEXT_CHARS = int(os.getenv('SEARCH_MAX_TEXT_CHARS', 2_000_000))
+# Summaries rank above body text for the same term
+SUMMARY_WEIGHT = 2.0
+BODY_WEIGHT = 1.0
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_match_query(query: str) -> str:
+    """Translate a user query into an FTS5 MATCH expression.
+
+    Bare words and "quoted phrases" must all match; `OR` between two terms
+    matches either, and a trailing `*` matches a prefix. Everything else is
+    quoted, so user input can never inject FTS5 syntax.
+    """
+    parts = []
+    for match in _QUERY_TOKEN.finditer(query):
+        phrase, word = match.groups()
+        if word == 'OR':
+            if parts and parts[-1] != 'OR':
+                parts.append('OR')
+            continue
+        text = phrase if phrase is not None else word
+        prefix = phrase is None and text.endswith('*') and len(text) > 1
+        text = text.rstrip('*') if prefix else text
+        if not re.search(r'\w', text):
+            continue
+        parts.append('"%s"%s' % (text.replace('"', '""'), '*' if prefix else ''))
+    while parts and parts[-1] == 'OR':
+        parts.pop()
+    if not parts:
+        raise ValueError("Search query has no searchable terms")
+    return ' '.join(parts)
+
+
+class SearchIndex:
+    """Embedded full-text index over extracted text and summaries (SQLite FTS5).
+
+    Text is indexed once per content hash and shared by every document with
+    that content, so duplicate uploads only add a small row. Updates are
+    incremental: each upload indexes its own text and entry, and nothing is
+    ever rebuilt.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS search_texts (
+                id INTEGER PRIMARY KEY,
+                content_hash TEXT NOT NULL UNIQUE
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                summary, body, tokenize = 'porter unicode61 remove_diacritics 2'
+            );
+            CREATE TABLE IF NOT EXISTS search_documents (
+                doc_key TEXT PRIMARY KEY,
+                text_id INTEGER NOT NULL,
+                file_name TEXT,
+                timestamp TEXT,
+                highest_severity TEXT
+            );
+            DROP INDEX IF EXISTS idx_search_documents_text;
+            -- Documents of one text in result order, so a page is read straight off the index
+            CREATE INDEX IF NOT EXISTS idx_search_documents_order ON search_documents(text_id, timestamp, doc_key);
+        """)
+        # Persistent FTS5 setting: `ORDER BY rank` weighs summaries above body text
+        self._conn.execute(
+            "INSERT INTO search_fts (search_fts, rank) VALUES ('rank', ?)", (f"bm25({SUMMARY_WEIGHT}, {BODY_WEIGHT})",)
+        )
+
+    def add_text(self, content_hash: str, text: str, summary: Optional[str] = None):
+        """Index the extracted text of a document; replaces earlier text for the same hash"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR IGNORE INTO search_texts (content_hash) VALUES (?)", (content_hash,))
+                text_id = self._conn.execute(
+                    "SELECT id FROM search_texts WHERE content_hash = ?", (content_hash,)).fetchone()[0]
+                self._conn.execute("DELETE FROM search_fts WHERE rowid = ?", (text_id,))
+                self._conn.execute(
+                    "INSERT INTO search_fts (rowid, summary, body) VALUES (?, ?, ?)",
+                    (text_id, summary or '', text[:SEARCH_MAX_TEXT_CHARS])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add_documents(self, documents: Sequence[Dict]) -> int:
+        """Make history entries searchable through the text indexed for their content hash.
+
+        Entries whose text was never indexed are skipped; returns how many were added.
+        """
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for document in documents:
+                    row = self._conn.execute(
+                        "SELECT id FROM search_texts WHERE content_hash = ?", (document.get('content_hash'),)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    self._conn.execute(
+                        """
+                        INSERT OR REPLACE INTO search_documents
+                            (doc_key, text_id, file_name, timestamp, highest_severity)
+                        VALUES (?, ?, ?, ?, ?)
+                        """,
+                        (document['document_id'], row[0], document.get('file_name'),
+                         document.get('timestamp'), document.get('highest_severity'))
+                    )
+                    added += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, order: str = 'relevance') -> List[Dict]:
+        """Matching documents with a highlighted snippet, best matches first.
+
+        Ranking scores every matching text, which costs about a microsecond
+        per match; order='recent' skips scoring and returns the most recently
+        indexed matches first, which stays fast even for very common terms.
+        Returns up to limit + 1 results so callers can tell if there is more.
+        """
+        if order not in ('relevance', 'recent'):
+            raise ValueError(f"Unknown search order: {order}")
+        match = build_match_query(query)
+        order_by = 'rank' if order == 'relevance' else 'rowid DESC'
+        with self._lock:
+            # Rank texts inside FTS5 alone; every text has at least one document
+            texts = self._conn.execute(
+                f"SELECT rowid, rank FROM search_fts WHERE search_fts MATCH ? ORDER BY {order_by} LIMIT ?",
+                (match, offset + limit + 1)
+            ).fetchall()
+            scores = dict(texts)
+            # Newest documents of each text in turn; a text shared by thousands of
+            # duplicates only contributes the rows that land on the page
+            page, skip = [], offset
+            for text_id, _ in texts:
+                if skip:
+                    shared = self._conn.execute(
+                        "SELECT COUNT(*) FROM search_documents WHERE text_id = ?", (text_id,)).fetchone()[0]
+                    if shared <= skip:
+                        skip -= shared
+                        continue
+                page.extend(self._conn.execute(
+                    """
+                    SELECT doc_key, text_id, file_name, timestamp, highest_severity FROM search_documents
+                    WHERE text_id = ? ORDER BY timestamp DESC, doc_key DESC LIMIT ? OFFSET ?
+                    """, (text_id, limit + 1 - len(page), skip)
+                ).fetchall())
+                skip = 0
+                if len(page) > limit:
+                    break
+
+            # Snippets only for the page, each one a rowid lookup
+            snippets = {}
+            for text_id in {row[1] for row in page}:
+                snippets[text_id] = self._conn.execute(
+                    "SELECT snippet(search_fts, -1, '[', ']', '...', 16) FROM search_fts "
+                    "WHERE search_fts MATCH ? AND rowid = ?", (match, text_id)
+                ).fetchone()[0]
+        return [
+            {
+                'document_id': doc_key,
+                'file_name': file_name,
+                'timestamp': timestamp,
+                'highest_severity': highest_severity,
+                # bm25 is lower for better matches; flip it so higher means more relevant
+                'score': -scores[text_id],
+                'snippet': snippets[text_id]
+            } for doc_key, text_id, file_name, timestamp, highest_severity in page
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM search_documents").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
@@ -0,0 +1,214 @@
+from typing import List, Optional, Tuple
+from concurrent.futures import Future
+import threading
+import asyncio
+import hashlib
+import logging
+import queue
+import re
+import os
+
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# 'transformers' loads a Hugging Face model; 'extractive' is a deterministic, dependency-free stand-in
+SUMMARY_BACKEND = os.getenv('SUMMARY_BACKEND', 'transformers')
+SUMMARY_MODEL = os.getenv('SUMMARY_MODEL', 'sshleifer/distilbart-cnn-12-6')
+SUMMARY_DEVICE = int(os.getenv('SUMMARY_DEVICE', -1))
+SUMMARY_MAX_LENGTH = int(os.getenv('SUMMARY_MAX_LENGTH', 50))
+SUMMARY_MIN_LENGTH = int(os.getenv('SUMMARY_MIN_LENGTH', 20))
+# Long documents are summarized in windows of at most this many tokens, then the partial summaries are combined
+SUMMARY_WINDOW_TOKENS = int(os.getenv('SUMMARY_WINDOW_TOKENS', 900))
+SUMMARY_WINDOW_OVERLAP = int(os.getenv('SUMMARY_WINDOW_OVERLAP', 50))
+# Requests arriving within SUMMARY_BATCH_WAIT seconds share one model call
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', 8))
+SUMMARY_BATCH_WAIT = float(os.getenv('SUMMARY_BATCH_WAIT', 0.05))
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 1024))
+SUMMARY_CACHE_DIR = os.getenv('SUMMARY_CACHE_DIR')
+
+
+class TransformersSummarizer:
+    def __init__(self, model: str = SUMMARY_MODEL, device: int = SUMMARY_DEVICE):
+        from transformers import pipeline
+        self.name = model
+        self.pipeline = pipeline('summarization', model=model, device=device)
+        self.tokenizer = self.pipeline.tokenizer
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def detokenize(self, tokens: List[int]) -> str:
+        return self.tokenizer.decode(tokens, skip_special_tokens=True)
+
+    def summarize_batch(self, texts: List[str]) -> List[str]:
+        outputs = self.pipeline(
+            texts,
+            batch_size=len(texts),
+            max_length=SUMMARY_MAX_LENGTH,
+            min_length=SUMMARY_MIN_LENGTH,
+            do_sample=False,
+            truncation=True
+        )
+        return [output['summary_text'] for output in outputs]
+
+
+class ExtractiveSummarizer:
+    """Leading sentences up to SUMMARY_MAX_LENGTH words; tokens are whitespace-separated words"""
+
+    name = 'extractive'
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.split()
+
+    def detokenize(self, tokens: List[str]) -> str:
+        return ' '.join(tokens)
+
+    def summarize_batch(self, texts: List[str]) -> List[str]:
+        return [self._summarize(text) for text in texts]
+
+    def _summarize(self, text: str) -> str:
+        words: List[str] = []
+        for sentence in re.split(r'(?<=[.!?])\s+', ' '.join(text.split())):
+            sentence_words = sentence.split()
+            if words and len(words) + len(sentence_words) > SUMMARY_MAX_LENGTH:
+                break
+            words.extend(sentence_words)
+        return ' '.join(words[:SUMMARY_MAX_LENGTH])
+
+
+SUMMARY_BACKENDS = {
+    'transformers': TransformersSummarizer,
+    'extractive': ExtractiveSummarizer
+}
+
+
+class SummarizationService:
+    """Resident summarizer shared by every caller in the process.
+
+    The model is loaded once, on first use. A background thread groups
+    requests from concurrent callers into micro-batches of document windows,
+    and finished summaries are cached by content hash and model.
+    """
+
+    def __init__(self, backend: str = SUMMARY_BACKEND, batch_size: int = SUMMARY_BATCH_SIZE,
+                 batch_wait: float = SUMMARY_BATCH_WAIT, window_tokens: int = SUMMARY_WINDOW_TOKENS,
+                 window_overlap: int = SUMMARY_WINDOW_OVERLAP, cache: Optional[ResultCache] = None):
+        if backend not in SUMMARY_BACKENDS:
+            raise ValueError(f"Unknown summary backend {backend!r}; expected one of {sorted(SUMMARY_BACKENDS)}")
+        self.backend_name = backend
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.window_tokens = window_tokens
+        self.window_overlap = min(window_overlap, window_tokens // 2)
+        self.cache = cache or ResultCache(max_entries=SUMMARY_CACHE_SIZE, cache_dir=SUMMARY_CACHE_DIR)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._requests: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    logger.info(f"Loading summarization backend {self.backend_name}")
+                    self._model = SUMMARY_BACKENDS[self.backend_name]()
+        return self._model
+
+    def summarize(self, text: str) -> str:
+        return self.submit(text).result()
+
+    async def summarize_async(self, text: str) -> str:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        if not text or not text.strip():
+            future.set_result('')
+            return future
+
+        cached = self.cache.get(self._cache_key(text))
+        if cached is not None:
+            future.set_result(cached['summary'])
+            return future
+
+        self._ensure_worker()
+        self._requests.put((text, future))
+        return future
+
+    def _cache_key(self, text: str) -> str:
+        content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        model = SUMMARY_MODEL if self.backend_name == 'transformers' else self.backend_name
+        return ResultCache.make_key(content_hash, model.replace('/', '_').replace(':', '_'))
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name='summarizer', daemon=True)
+                self._worker.start()
+
+    def _work(self):
+        while True:
+            batch = [self._requests.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._requests.get(timeout=self.batch_wait))
+                except queue.Empty:
+                    break
+
+            try:
+                summaries = self._summarize_documents([text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Summarization failed for {len(batch)} documents: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (text, future), summary in zip(batch, summaries):
+                self.cache.put(self._cache_key(text), {'summary': summary})
+                future.set_result(summary)
+
+    def _windows(self, text: str) -> List[str]:
+        tokens = self.model.tokenize(text)
+        if len(tokens) <= self.window_tokens:
+            return [text]
+        step = self.window_tokens - self.window_overlap
+        return [
+            self.model.detokenize(tokens[start:start + self.window_tokens])
+            for start in range(0, len(tokens) - self.window_overlap, step)
+        ]
+
+    def _summarize_documents(self, texts: List[str]) -> List[str]:
+        """Summarize every window of every document, combining partial summaries until each fits one window"""
+        parts = [self._windows(text) for text in texts]
+        flat = [window for windows in parts for window in windows]
+        summaries = []
+        for start in range(0, len(flat), self.batch_size):
+            summaries.extend(self.model.summarize_batch(flat[start:start + self.batch_size]))
+
+        results, position = [], 0
+        for windows in parts:
+            results.append(' '.join(summaries[position:position + len(windows)]))
+            position += len(windows)
+
+        # Documents that needed several windows have their joined summaries summarized again
+        pending = [index for index, windows in enumerate(parts) if len(windows) > 1]
+        if pending:
+            reduced = self._summarize_documents([results[index] for index in pending])
+            for index, summary in zip(pending, reduced):
+                results[index] = summary
+        return results
+
+
+_summarization_service: Optional[SummarizationService] = None
+_summarization_lock = threading.Lock()
+
+
+def get_summarization_service() -> SummarizationService:
+    global _summarization_service
+    with _summarization_lock:
+        if _summarization_service is None:
+            _summarization_service = SummarizationService()
+        return _summarization_service
@@ -1,3 +1,9 @@
-from .opensearch_client import OpenSearchClient
+__all__ = ['OpenSearchClient']
 
-__all__ = ['OpenSearchClient']
\ No newline at end of file
+
+def __getattr__(name):
+    # opensearch-py (and aiohttp behind it) is slow to import and not needed to serve uploads
+    if name == 'OpenSearchClient':
+        from .opensearch_client import OpenSearchClient
+        return OpenSearchClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,31 @@
 from typing import Dict
-import asyncio
 
-department_emails = {
-    'Safety Department': 'safety@company.com',
-    'Maintenance Department': 'maintenance@company.com',
-    'Hr Department': 'hr@company.com'
-}
+from .notifications import Notification, get_notification_dispatcher
+from ..processor.ruleset import get_ruleset
 
 async def send_alert_emails(result: Dict):
+    """Queue one notification per department recipient; the dispatcher batches and sends them"""
+    departments = get_ruleset().departments
+    by_name = {dept.name: dept for dept in departments.values()}
+    # Context snippets stay on the alerts; the department entries only summarise them
+    contexts = {alert['department']: alert.get('contexts') or [] for alert in result.get('alerts', [])}
+    notifications = []
     for dept in result['departments']:
-        dept_name = dept['name']
-        dept_email = department_emails.get(dept_name, '')
-        
-        print(f"\n=== Alert Notification ===")
-        print(f"To: {dept_name} ({dept_email})")
-        print(f"Severity: {dept['severity'].upper()}")
-        print(f"Keywords: {', '.join(dept['keywords'])}")
-        print("=" * 25)
\ No newline at end of file
+        # Results cached before departments carried an id are matched by name
+        ruleset_dept = departments.get(dept.get('id')) or by_name.get(dept['name'])
+        if ruleset_dept is None:
+            continue
+
+        snippets = contexts.get(ruleset_dept.id) or []
+        for dept_email in ruleset_dept.emails:
+            notifications.append(Notification(
+                recipient=dept_email,
+                department=ruleset_dept.name,
+                severity=dept['severity'],
+                keywords=dept['keywords'],
+                file_name=result.get('file_name'),
+                document_id=result.get('document_id'),
+                context=snippets[0]['text'] if snippets else None
+            ))
+
+    get_notification_dispatcher().submit(notifications)
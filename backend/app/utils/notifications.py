@@ -0,0 +1,236 @@
+from typing import Dict, List, Optional
+from collections import deque
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+import smtplib
+import asyncio
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Without SMTP_HOST, digests are printed to the console instead of mailed
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT') or 25)
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASS = os.getenv('SMTP_PASS')
+SMTP_SENDER = os.getenv('SMTP_SENDER') or SMTP_USER or 'alerts@company.com'
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true' if SMTP_PORT == 587 else 'false').lower() == 'true'
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 10))
+
+# Alerts for the same recipient arriving within this many seconds go out as one digest
+NOTIFY_WINDOW = float(os.getenv('NOTIFY_WINDOW', 5))
+# At most NOTIFY_RATE_LIMIT digests per recipient every NOTIFY_RATE_PERIOD seconds
+NOTIFY_RATE_LIMIT = int(os.getenv('NOTIFY_RATE_LIMIT', 6))
+NOTIFY_RATE_PERIOD = float(os.getenv('NOTIFY_RATE_PERIOD', 60))
+NOTIFY_MAX_RETRIES = int(os.getenv('NOTIFY_MAX_RETRIES', 3))
+NOTIFY_RETRY_BACKOFF = float(os.getenv('NOTIFY_RETRY_BACKOFF', 1.0))
+
+SEVERITY_ORDER = {'critical': 3, 'high': 2, 'medium': 1, 'low': 0}
+
+
+@dataclass
+class Notification:
+    recipient: str
+    department: str
+    severity: str
+    keywords: List[str] = field(default_factory=list)
+    file_name: Optional[str] = None
+    document_id: Optional[str] = None
+    # Sentence around the first hit, so recipients can triage from the email
+    context: Optional[str] = None
+
+
+def build_digest(recipient: str, notifications: List[Notification], sender: str = SMTP_SENDER) -> EmailMessage:
+    """One email summarising every pending alert for a recipient"""
+    severity = max((n.severity for n in notifications), key=lambda s: SEVERITY_ORDER.get(s, -1))
+    departments = sorted({n.department for n in notifications})
+    count = len(notifications)
+
+    lines = [f"{count} new alert{'s' if count != 1 else ''} for {', '.join(departments)}", ""]
+    for n in notifications:
+        source = n.file_name or n.document_id or 'unknown document'
+        lines.append(f"- [{n.severity.upper()}] {source}: {', '.join(n.keywords)}")
+        if n.context:
+            lines.append(f"    \"{n.context}\"")
+
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = recipient
+    message['Subject'] = f"[{severity.upper()}] {count} alert{'s' if count != 1 else ''} for {', '.join(departments)}"
+    message.set_content('\n'.join(lines))
+    return message
+
+
+class DeliveryError(Exception):
+    """Transport failure after `sent` messages of the batch were delivered"""
+
+    def __init__(self, sent: int, cause: Exception):
+        super().__init__(str(cause))
+        self.sent = sent
+
+
+class ConsoleTransport:
+    def send(self, messages: List[EmailMessage]):
+        for message in messages:
+            print(f"\n=== Alert Notification ===")
+            print(f"To: {message['To']}")
+            print(f"Subject: {message['Subject']}")
+            print(message.get_content().rstrip())
+            print("=" * 25)
+
+
+class SmtpTransport:
+    """Sends each batch over a single SMTP connection"""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, user: Optional[str] = SMTP_USER,
+                 password: Optional[str] = SMTP_PASS, starttls: bool = SMTP_STARTTLS, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, messages: List[EmailMessage]):
+        sent = 0
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.user:
+                    smtp.login(self.user, self.password or '')
+                for message in messages:
+                    try:
+                        smtp.send_message(message)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Permanent for this address; retrying would not help
+                        logger.error(f"Recipient refused for {message['To']}: {str(e)}")
+                    sent += 1
+        except (smtplib.SMTPException, OSError) as e:
+            raise DeliveryError(sent, e) from e
+
+
+class NotificationDispatcher:
+    """Async queue that coalesces alerts per recipient and sends them in batches.
+
+    Notifications collected during one window become one digest per recipient,
+    and all digests of a window share a single transport connection. A
+    recipient over its rate limit keeps accumulating alerts until the next
+    window it is allowed to receive. Failed batches are retried with
+    exponential backoff.
+    """
+
+    def __init__(self, transport=None, window: float = NOTIFY_WINDOW, rate_limit: int = NOTIFY_RATE_LIMIT,
+                 rate_period: float = NOTIFY_RATE_PERIOD, max_retries: int = NOTIFY_MAX_RETRIES,
+                 retry_backoff: float = NOTIFY_RETRY_BACKOFF):
+        self.transport = transport or (SmtpTransport() if SMTP_HOST else ConsoleTransport())
+        self.window = window
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[Notification]] = {}
+        self._sent_at: Dict[str, deque] = {}
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, notifications: List[Notification]):
+        """Queue notifications without waiting for delivery"""
+        self.start()
+        for notification in notifications:
+            self._queue.put_nowait(notification)
+
+    def depth(self) -> int:
+        """Notifications waiting in the queue or held for a digest"""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + sum(len(pending) for pending in self._pending.values())
+
+    async def stop(self):
+        """Deliver everything still queued, ignoring rate limits, then stop"""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                item = await self._queue.get()
+                if item is None:
+                    return
+                self._add(item)
+
+            deadline = loop.time() + self.window
+            while True:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    await self._flush(force=True)
+                    return
+                self._add(item)
+
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Notification flush failed: {str(e)}")
+
+    def _add(self, notification: Notification):
+        self._pending.setdefault(notification.recipient, []).append(notification)
+
+    def _allow(self, recipient: str, now: float) -> bool:
+        sent_at = self._sent_at.setdefault(recipient, deque())
+        while sent_at and now - sent_at[0] >= self.rate_period:
+            sent_at.popleft()
+        if len(sent_at) >= self.rate_limit:
+            return False
+        sent_at.append(now)
+        return True
+
+    async def _flush(self, force: bool = False):
+        now = time.monotonic()
+        ready = [
+            (recipient, self._pending.pop(recipient))
+            for recipient in list(self._pending)
+            if force or self._allow(recipient, now)
+        ]
+        if ready:
+            await self._deliver([build_digest(recipient, notifications) for recipient, notifications in ready])
+
+    async def _deliver(self, messages: List[EmailMessage]):
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                await loop.run_in_executor(None, self.transport.send, messages)
+                return
+            except DeliveryError as e:
+                messages = messages[e.sent:]
+                if attempt == self.max_retries:
+                    logger.error(f"Dropping {len(messages)} notifications after {attempt + 1} attempts: {str(e)}")
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"Notification delivery failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher()
+    return _dispatcher
@@ -1,23 +1,171 @@
-from opensearchpy import OpenSearch
+from opensearchpy import AsyncOpenSearch
+from opensearchpy.exceptions import ConnectionError, TransportError
+from opensearchpy.helpers import async_streaming_bulk
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import logging
+import json
+import uuid
 import os
 
+logger = logging.getLogger(__name__)
+
+OPENSEARCH_POOL_SIZE = int(os.getenv('OPENSEARCH_POOL_SIZE', 10))
+OPENSEARCH_BULK_SIZE = int(os.getenv('OPENSEARCH_BULK_SIZE', 500))
+OPENSEARCH_BULK_BYTES = int(os.getenv('OPENSEARCH_BULK_BYTES', 5 * 1024 * 1024))
+OPENSEARCH_FLUSH_INTERVAL = float(os.getenv('OPENSEARCH_FLUSH_INTERVAL', 1.0))
+# Retries of a bulk request that failed in transport, doubling the delay each time
+OPENSEARCH_BULK_RETRIES = int(os.getenv('OPENSEARCH_BULK_RETRIES', 3))
+OPENSEARCH_RETRY_BACKOFF = float(os.getenv('OPENSEARCH_RETRY_BACKOFF', 0.5))
+
+
+@dataclass
+class BulkResult:
+    indexed: int = 0
+    failed: List[Dict] = field(default_factory=list)
+
+    def merge(self, other: Optional['BulkResult']):
+        if other is not None:
+            self.indexed += other.indexed
+            self.failed.extend(other.failed)
+
+    @classmethod
+    def from_outcomes(cls, outcomes: List[Tuple[bool, Dict]]) -> 'BulkResult':
+        return cls(indexed=sum(1 for ok, _ in outcomes if ok), failed=[item for ok, item in outcomes if not ok])
+
+
+def _is_retryable(error: Exception) -> bool:
+    # ConnectionError covers timeouts; 429 and 5xx are worth another try, other statuses are not
+    if isinstance(error, ConnectionError):
+        return True
+    return isinstance(error, TransportError) and isinstance(error.status_code, int) and (
+        error.status_code == 429 or error.status_code >= 500)
+
+
+class BulkIndexer:
+    """Buffers index actions and sends them to `_bulk` in batches.
+
+    A batch is sent when it reaches max_actions or max_bytes, or when
+    flush_interval seconds pass after the first buffered action. Failed items
+    from a partially successful bulk request are returned and logged; they
+    never fail the whole batch. A request that fails in transport is retried
+    with backoff; if it still fails, the actions that got no answer go back
+    to the front of the buffer for the next flush and the error is raised.
+
+    Each action has its own id, so a retried request never indexes a
+    document twice, and `add` returns a future for the action's own outcome.
+    """
+
+    def __init__(self, client: AsyncOpenSearch, max_actions: int = OPENSEARCH_BULK_SIZE,
+                 max_bytes: int = OPENSEARCH_BULK_BYTES, flush_interval: float = OPENSEARCH_FLUSH_INTERVAL,
+                 retries: int = OPENSEARCH_BULK_RETRIES, retry_backoff: float = OPENSEARCH_RETRY_BACKOFF):
+        self.client = client
+        self.max_actions = max_actions
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._pending: List[Tuple[Dict, int, asyncio.Future]] = []
+        self._bytes = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def add(self, index: str, document: Dict) -> asyncio.Future:
+        """Buffer one document.
+
+        The returned future resolves to (ok, item) once the action has been
+        sent, whichever flush sends it.
+        """
+        size = len(json.dumps(document, default=str))
+        outcome = asyncio.get_running_loop().create_future()
+        self._pending.append(({'_index': index, '_id': uuid.uuid4().hex, '_source': document}, size, outcome))
+        self._bytes += size
+        if len(self._pending) >= self.max_actions or self._bytes >= self.max_bytes:
+            await self.flush()
+        else:
+            self._schedule_flush()
+        return outcome
+
+    def _schedule_flush(self):
+        if not self._closed and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        # A failed flush schedules the next attempt itself
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Timed bulk flush failed: {str(e)}")
+
+    async def flush(self) -> BulkResult:
+        """Send everything buffered; returns the outcome of every action sent"""
+        async with self._lock:
+            batch, self._pending, self._bytes = self._pending, [], 0
+            outcomes: List[Tuple[bool, Dict]] = []
+            attempt = 0
+            while batch:
+                try:
+                    async for ok, item in async_streaming_bulk(
+                            self.client, [action for action, _, _ in batch],
+                            chunk_size=self.max_actions, max_chunk_bytes=max(self.max_bytes, 1) * 2,
+                            raise_on_error=False, raise_on_exception=True):
+                        # Results arrive in action order
+                        _, _, future = batch.pop(0)
+                        outcomes.append((ok, item))
+                        if not future.done():
+                            future.set_result((ok, item))
+                except Exception as e:
+                    attempt += 1
+                    if attempt > self.retries or not _is_retryable(e):
+                        # Keep what got no answer for the next flush, ahead of newer actions
+                        self._pending = batch + self._pending
+                        self._bytes += sum(size for _, size, _ in batch)
+                        self._schedule_flush()
+                        logger.error(f"Bulk request failed, {len(batch)} actions kept for the next flush: {str(e)}")
+                        raise
+                    delay = self.retry_backoff * 2 ** (attempt - 1)
+                    logger.warning(f"Bulk request failed, retrying in {delay:.1f}s: {str(e)}")
+                    await asyncio.sleep(delay)
+
+            result = BulkResult.from_outcomes(outcomes)
+            if self._timer is not None and not self._timer.done() and not self._pending:
+                self._timer.cancel()
+            if result.failed:
+                logger.error(f"Bulk indexing: {len(result.failed)} of {len(outcomes)} actions failed")
+            return result
+
+    async def close(self) -> BulkResult:
+        self._closed = True
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        return await self.flush()
+
+
 class OpenSearchClient:
     def __init__(self):
-        self.client = OpenSearch(
+        self.client = AsyncOpenSearch(
             hosts=[{
                 'host': os.getenv('OPENSEARCH_HOST', 'opensearch'),
                 'port': int(os.getenv('OPENSEARCH_PORT', 9200))
             }],
             http_auth=None,
-            use_ssl=False
+            use_ssl=False,
+            maxsize=OPENSEARCH_POOL_SIZE
         )
         self.document_index = 'documents'
         self.alerts_index = 'alerts'
-        self._setup_indices()
+        self.bulk = BulkIndexer(self.client)
+        self._indices_ready = False
+
+    async def _setup_indices(self):
+        if self._indices_ready:
+            return
 
-    def _setup_indices(self):
         document_mapping = {
             "mappings": {
                 "properties": {
@@ -43,20 +191,24 @@ class OpenSearchClient:
             }
         }
 
-        for index, mapping in [(self.document_index, document_mapping), 
+        for index, mapping in [(self.document_index, document_mapping),
                              (self.alerts_index, alerts_mapping)]:
-            if not self.client.indices.exists(index=index):
-                self.client.indices.create(index=index, body=mapping)
+            if not await self.client.indices.exists(index=index):
+                await self.client.indices.create(index=index, body=mapping)
+        self._indices_ready = True
 
     async def store_document(self, doc_data: Dict[str, Any]) -> str:
+        await self._setup_indices()
         doc_data['created_at'] = datetime.utcnow()
-        response = self.client.index(
+        response = await self.client.index(
             index=self.document_index,
             body=doc_data
         )
         return response['_id']
 
     async def store_alerts(self, doc_id: str, alerts: List[Dict]) -> None:
+        """Queue alerts on the bulk indexer; they are sent with the next flush"""
+        await self._setup_indices()
         for alert in alerts:
             alert_data = {
                 'document_id': doc_id,
@@ -65,14 +217,27 @@ class OpenSearchClient:
                 'keywords': alert['keywords'],
                 'created_at': datetime.utcnow()
             }
-            self.client.index(
-                index=self.alerts_index,
-                body=alert_data
-            )
+            await self.bulk.add(self.alerts_index, alert_data)
+
+    async def store_documents(self, documents: List[Dict[str, Any]]) -> BulkResult:
+        """Index many documents through `_bulk` and report per-item failures of these documents"""
+        await self._setup_indices()
+        outcomes = []
+        for doc_data in documents:
+            doc_data['created_at'] = datetime.utcnow()
+            outcomes.append(await self.bulk.add(self.document_index, doc_data))
+        await self.bulk.flush()
+        # Only this call's items, not those of other callers sent in the same batches
+        return BulkResult.from_outcomes(list(await asyncio.gather(*outcomes)))
 
     async def get_document(self, doc_id: str) -> Dict:
-        response = self.client.get(
+        response = await self.client.get(
             index=self.document_index,
             id=doc_id
         )
-        return response['_source']
\ No newline at end of file
+        return response['_source']
+
+    async def close(self) -> BulkResult:
+        result = await self.bulk.close()
+        await self.client.close()
+        return result
@@ -0,0 +1,178 @@
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+import cProfile
+import asyncio
+import logging
+import pstats
+import shutil
+import hmac
+import json
+import uuid
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Profiling is disabled unless an admin token is configured
+PROFILE_ADMIN_TOKEN = os.getenv('PROFILE_ADMIN_TOKEN')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'profiles'))
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', 15))
+# Oldest profiles are deleted beyond this many
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 100))
+
+# Stages that await (saving the upload, sending notifications) are only in the stage metrics
+PROFILE_SCOPE = 'Synchronous stages and worker-side processing; time spent awaiting is not profiled'
+
+_REQUEST_ID = re.compile(r'^[0-9a-f]{32}$')
+_current: ContextVar[Optional['RequestProfile']] = ContextVar('current_profile', default=None)
+# cProfile keeps one active profiler per thread, so profiled requests run one at a time
+_profile_lock: Optional[asyncio.Lock] = None
+
+
+class ProfilingDenied(Exception):
+    pass
+
+
+def authorize(token: Optional[str]):
+    if not PROFILE_ADMIN_TOKEN:
+        raise ProfilingDenied("Profiling is disabled")
+    if not token or not hmac.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        raise ProfilingDenied("A valid admin token is required for profiling")
+
+
+class _Snapshot:
+    """Adapter that lets pstats load a raw stats dict, e.g. one returned by a worker process"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RequestProfile:
+    """cProfile stats of one request, collected per pipeline stage"""
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started_at = datetime.now().isoformat()
+        self.stages: Dict[str, List[Dict]] = {}
+
+    def add(self, stage: str, stats: Dict):
+        self.stages.setdefault(stage, []).append(stats)
+
+    def save(self, directory: str = PROFILE_DIR, top: int = PROFILE_TOP) -> Dict:
+        """Write <stage>.prof files (readable by pstats or snakeviz) and summary.json"""
+        path = os.path.join(directory, self.request_id)
+        os.makedirs(path, exist_ok=True)
+        summary = {'request_id': self.request_id, 'started_at': self.started_at, 'scope': PROFILE_SCOPE, 'stages': {}}
+        for stage, snapshots in self.stages.items():
+            stats = pstats.Stats(_Snapshot(snapshots[0]))
+            for snapshot in snapshots[1:]:
+                stats.add(_Snapshot(snapshot))
+            stats.dump_stats(os.path.join(path, f"{stage}.prof"))
+            summary['stages'][stage] = {
+                'total_seconds': stats.total_tt,
+                'top_functions': _top_functions(stats, top)
+            }
+        with open(os.path.join(path, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        _prune(directory)
+        return summary
+
+
+def _top_functions(stats: pstats.Stats, top: int) -> List[Dict]:
+    stats.sort_stats('tottime')
+    functions = []
+    for func in stats.fcn_list[:top]:
+        primitive_calls, calls, own_time, cumulative_time, _ = stats.stats[func]
+        functions.append({
+            'function': pstats.func_std_string(func),
+            'calls': calls,
+            'own_seconds': own_time,
+            'cumulative_seconds': cumulative_time
+        })
+    return functions
+
+
+def _prune(directory: str):
+    try:
+        entries = sorted(
+            (entry for entry in os.scandir(directory) if entry.is_dir() and _REQUEST_ID.match(entry.name)),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries[:max(len(entries) - PROFILE_KEEP, 0)]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    except OSError as e:
+        logger.error(f"Failed to prune profiles: {str(e)}")
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+@asynccontextmanager
+async def profile_request():
+    """Profile the stages run inside this block and save them afterwards, even on failure"""
+    global _profile_lock
+    if _profile_lock is None:
+        _profile_lock = asyncio.Lock()
+    async with _profile_lock:
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            yield profile
+        finally:
+            _current.reset(token)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, profile.save)
+            except Exception as e:
+                logger.error(f"Failed to save profile {profile.request_id}: {str(e)}")
+
+
+@contextmanager
+def profile_stage(stage: str):
+    """Profile the block on the current thread when a request profile is active; otherwise a no-op
+
+    The block must not await: cProfile follows the thread, not the task, so
+    other requests served by the event loop meanwhile would be counted too.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.create_stats()
+        profile.add(stage, profiler.stats)
+
+
+def profile_call(func, *args):
+    """Run func under cProfile and return (result, raw stats); picklable for worker processes"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args)
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+def load_summary(request_id: str, directory: str = PROFILE_DIR) -> Optional[Dict]:
+    if not _REQUEST_ID.match(request_id):
+        return None
+    try:
+        with open(os.path.join(directory, request_id, 'summary.json'), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def stage_file(request_id: str, stage: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    summary = load_summary(request_id, directory)
+    if summary is None or stage not in summary['stages']:
+        return None
+    return os.path.join(directory, request_id, f"{stage}.prof")
@@ -0,0 +1,125 @@
+from typing import Callable, Iterable, Optional
+from dataclasses import dataclass
+from fastapi import UploadFile
+import aiofiles
+import hashlib
+import json
+import os
+
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 50 * 1024 * 1024))
+
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the maximum size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    size: int
+    sha256: str
+    mime_type: Optional[str] = None
+
+
+async def save_upload(upload: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES,
+                      chunk_size: int = UPLOAD_CHUNK_SIZE,
+                      sniff: Optional[Callable[[bytes], str]] = None) -> SavedUpload:
+    """Stream an upload to disk in fixed-size chunks.
+
+    The SHA-256 and size are computed in the same pass. Only one chunk is held
+    in memory at a time, and the partial file is removed if the upload goes
+    over max_bytes.
+
+    sniff is called with the first chunk before anything is written and
+    returns the MIME type of the content; raising from it rejects the upload
+    without touching the disk.
+    """
+    size = getattr(upload, 'size', None)
+    if size is not None and size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    chunk = await upload.read(chunk_size)
+    mime_type = sniff(chunk) if sniff is not None else None
+
+    digest = hashlib.sha256()
+    total = 0
+    partial_path = dest_path + '.part'
+    try:
+        async with aiofiles.open(partial_path, 'wb') as out_file:
+            while chunk:
+                total += len(chunk)
+                if total > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await out_file.write(chunk)
+                chunk = await upload.read(chunk_size)
+        os.replace(partial_path, dest_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return SavedUpload(path=dest_path, size=total, sha256=digest.hexdigest(), mime_type=mime_type)
+
+
+class RequestSizeLimitMiddleware:
+    """Rejects oversized upload requests with 413 before the body is parsed.
+
+    A declared Content-Length over the limit is refused before any body bytes
+    are read. Chunked bodies are counted while they stream in, and the request
+    is cut off as soon as the limit is crossed.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: Optional[Iterable[str]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths) if paths else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or (self.paths is not None and scope['path'] not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        content_length = headers.get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        responded = False
+
+        async def limited_receive():
+            nonlocal received, responded
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    if not responded:
+                        responded = True
+                        await self._reject(send)
+                    # Makes the body parser stop as if the client went away
+                    return {'type': 'http.disconnect'}
+            return message
+
+        async def guarded_send(message):
+            # Drop the app's own error response once the 413 has been sent
+            if not responded:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, send):
+        body = json.dumps({'detail': str(UploadTooLarge(self.max_bytes))}).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
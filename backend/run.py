@@ -11,5 +11,6 @@ if __name__ == "__main__":
         "app.main:app",
         host="127.0.0.1",  # Using localhost instead of 0.0.0.0
         port=8000,
-        reload=True
+        # The reloader doubles cold-start time; enable it only for local development
+        reload=os.getenv("UVICORN_RELOAD", "false").lower() == "true"
     )
\ No newline at end of file
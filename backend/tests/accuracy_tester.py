@@ -1,111 +1,229 @@
 import json
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import hashlib
 import os
 import sys
-import os
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.processor.alert_detector import AlertDetector
-import pandas as pd
-from sklearn.metrics import precision_recall_fscore_support, confusion_matrix
-import seaborn as sns
-import matplotlib.pyplot as plt
+from app.processor.ruleset import Ruleset, get_ruleset
+from app.services.result_cache import ResultCache
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_TEST_FILE = os.path.join('test_documents', 'test_cases.json')
+CHART_FILE = os.path.join(BASE_PATH, 'test_documents', 'accuracy_metrics.png')
+
+# Corpora larger than one chunk are evaluated in a process pool, one chunk per task
+ACCURACY_WORKERS = int(os.getenv('ACCURACY_WORKERS', os.cpu_count() or 1))
+ACCURACY_CHUNK_SIZE = int(os.getenv('ACCURACY_CHUNK_SIZE', 250))
+ACCURACY_CACHE_SIZE = int(os.getenv('ACCURACY_CACHE_SIZE', 16))
+# Optional on-disk tier for reports, keyed by corpus hash and ruleset version
+ACCURACY_CACHE_DIR = os.getenv('ACCURACY_CACHE_DIR')
+
+_report_cache = ResultCache(max_entries=ACCURACY_CACHE_SIZE, cache_dir=ACCURACY_CACHE_DIR)
+_corpus_hashes: Dict[Tuple[str, int, int], str] = {}
+
+Prediction = Tuple[List[str], str, List[str]]
+
+
+def _predict_chunk(ruleset: Ruleset, documents: List[str]) -> List[Prediction]:
+    """Departments, severity and keywords detected in each document; runs in a worker process"""
+    detector = AlertDetector(ruleset)
+    predictions = []
+    for document in documents:
+        # Context snippets play no part in the scores
+        alerts = detector.build_alerts(detector.matcher.iter_hits(document))
+        predictions.append((
+            [alert['department'] for alert in alerts],
+            # Every alert of a document shares one severity
+            alerts[0]['severity'] if alerts else 'low',
+            sorted({kw.lower() for alert in alerts for kw in alert['keywords']})
+        ))
+    return predictions
+
+
+def _label_matrix(label_sets: List[List[str]], labels: List[str]) -> np.ndarray:
+    """One row per case, one boolean column per label"""
+    index = {label: i for i, label in enumerate(labels)}
+    matrix = np.zeros((len(label_sets), len(labels)), dtype=bool)
+    for row, label_set in enumerate(label_sets):
+        columns = [index[label] for label in label_set if label in index]
+        matrix[row, columns] = True
+    return matrix
+
+
+def _coverage(expected: np.ndarray, predicted: np.ndarray) -> np.ndarray:
+    """Share of expected labels predicted per case; 1.0 when nothing was expected"""
+    expected_counts = expected.sum(axis=1)
+    found = (expected & predicted).sum(axis=1)
+    return np.where(expected_counts > 0, found / np.maximum(expected_counts, 1), 1.0)
+
 
 class AccuracyTester:
-    def __init__(self):
-        self.alert_detector = AlertDetector()
-        
-    def load_test_cases(self, test_file: str) -> List[Dict]:
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        full_path = os.path.join(base_path, 'test_documents', 'test_cases.json')
-        with open(full_path, 'r') as f:
+    def __init__(self, workers: int = ACCURACY_WORKERS, chunk_size: int = ACCURACY_CHUNK_SIZE,
+                 cache: Optional[ResultCache] = None):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cache = cache or _report_cache
+
+    @staticmethod
+    def resolve_test_file(test_file: str = DEFAULT_TEST_FILE) -> str:
+        return test_file if os.path.isabs(test_file) else os.path.join(BASE_PATH, test_file)
+
+    def load_test_cases(self, test_file: str = DEFAULT_TEST_FILE) -> List[Dict]:
+        """Cases from a {"test_cases": [...]} JSON file, or a JSONL file with one case per line"""
+        full_path = self.resolve_test_file(test_file)
+        with open(full_path, 'r', encoding='utf-8') as f:
+            if full_path.endswith('.jsonl'):
+                return [json.loads(line) for line in f if line.strip()]
             data = json.load(f)
             return data.get('test_cases', [])
 
-    def evaluate_single_case(self, test_case: Dict) -> Dict:
-        # Get system prediction
-        alerts = self.alert_detector.detect_alerts(test_case['document'])
-        
-        # Extract predictions
-        predicted_depts = set([alert['department'] for alert in alerts])
-        predicted_severity = max([alert['severity'] for alert in alerts], default='low')
-        predicted_keywords = set([kw.lower() for alert in alerts for kw in alert['keywords']])
-        
-        # Extract expected values
-        expected_depts = set(test_case['expected']['departments'])
-        expected_severity = test_case['expected']['severity']
-        expected_keywords = set([kw.lower() for kw in test_case['expected']['keywords']])
-        
-        # Calculate accuracy metrics
-        dept_accuracy = len(predicted_depts.intersection(expected_depts)) / len(expected_depts) if expected_depts else 1.0
-        severity_accuracy = 1.0 if predicted_severity == expected_severity else 0.0
-        keyword_accuracy = len(predicted_keywords.intersection(expected_keywords)) / len(expected_keywords) if expected_keywords else 1.0
-        
-        return {
-            'department_accuracy': dept_accuracy,
-            'severity_accuracy': severity_accuracy,
-            'keyword_accuracy': keyword_accuracy,
-            'predicted': {
-                'departments': list(predicted_depts),
-                'severity': predicted_severity,
-                'keywords': list(predicted_keywords)
-            },
-            'expected': test_case['expected']
-        }
+    def corpus_hash(self, test_file: str = DEFAULT_TEST_FILE) -> str:
+        """Content hash of the test file, recomputed only when the file changes"""
+        full_path = self.resolve_test_file(test_file)
+        stat = os.stat(full_path)
+        stamp = (full_path, stat.st_mtime_ns, stat.st_size)
+        if stamp not in _corpus_hashes:
+            digest = hashlib.sha256()
+            with open(full_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            _corpus_hashes[stamp] = digest.hexdigest()
+        return _corpus_hashes[stamp]
+
+    def cache_key(self, test_file: str = DEFAULT_TEST_FILE, ruleset: Optional[Ruleset] = None) -> str:
+        return ResultCache.make_key(self.corpus_hash(test_file), (ruleset or get_ruleset()).version)
+
+    def predict(self, documents: List[str], ruleset: Ruleset) -> List[Prediction]:
+        chunks = [documents[i:i + self.chunk_size] for i in range(0, len(documents), self.chunk_size)]
+        if len(chunks) <= 1 or self.workers <= 1:
+            return [prediction for chunk in chunks for prediction in _predict_chunk(ruleset, chunk)]
+        # The ruleset is sent along so every chunk is scored against the same version
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+            results = pool.map(_predict_chunk, [ruleset] * len(chunks), chunks)
+            return [prediction for chunk_result in results for prediction in chunk_result]
+
+    def evaluate(self, test_cases: List[Dict], ruleset: Ruleset) -> Dict:
+        predictions = self.predict([case['document'] for case in test_cases], ruleset)
+        expected = [case['expected'] for case in test_cases]
+
+        departments = sorted(set(ruleset.detector_departments).union(
+            *(case['departments'] for case in expected)))
+        expected_depts = _label_matrix([case['departments'] for case in expected], departments)
+        predicted_depts = _label_matrix([p[0] for p in predictions], departments)
+
+        # Only expected keywords count, so they alone make up the keyword columns
+        expected_keywords = [[kw.lower() for kw in case['keywords']] for case in expected]
+        keywords = sorted(set().union(*expected_keywords))
+        expected_kw = _label_matrix(expected_keywords, keywords)
+        predicted_kw = _label_matrix([p[2] for p in predictions], keywords)
+
+        dept_accuracy = _coverage(expected_depts, predicted_depts)
+        keyword_accuracy = _coverage(expected_kw, predicted_kw)
+        severity_accuracy = (np.array([p[1] for p in predictions]) ==
+                             np.array([case['severity'] for case in expected])).astype(float)
+
+        from sklearn.metrics import precision_recall_fscore_support
+        precision, recall, f1, support = precision_recall_fscore_support(
+            expected_depts, predicted_depts, average=None, zero_division=0)
 
-    def run_accuracy_test(self, test_file: str = 'test_documents/test_cases.json') -> Dict:
-        test_cases = self.load_test_cases(test_file)
-        results = []
-        
-        for case in test_cases:
-            result = self.evaluate_single_case(case)
-            results.append(result)
-        
-        # Calculate overall metrics
-        avg_dept_accuracy = sum(r['department_accuracy'] for r in results) / len(results)
-        avg_severity_accuracy = sum(r['severity_accuracy'] for r in results) / len(results)
-        avg_keyword_accuracy = sum(r['keyword_accuracy'] for r in results) / len(results)
-        
-        overall_accuracy = (avg_dept_accuracy + avg_severity_accuracy + avg_keyword_accuracy) / 3
-        
-        # Generate detailed report
-        report = {
-            'overall_accuracy': overall_accuracy,
+        component_means = np.array([dept_accuracy.mean(), severity_accuracy.mean(), keyword_accuracy.mean()])
+        return {
+            'overall_accuracy': float(component_means.mean()),
             'metrics': {
-                'department_accuracy': avg_dept_accuracy,
-                'severity_accuracy': avg_severity_accuracy,
-                'keyword_accuracy': avg_keyword_accuracy
+                'department_accuracy': float(component_means[0]),
+                'severity_accuracy': float(component_means[1]),
+                'keyword_accuracy': float(component_means[2])
+            },
+            'per_department': {
+                dept: {
+                    'precision': float(precision[i]),
+                    'recall': float(recall[i]),
+                    'f1': float(f1[i]),
+                    'support': int(support[i])
+                } for i, dept in enumerate(departments)
             },
-            'detailed_results': results
+            'detailed_results': [
+                {
+                    'department_accuracy': float(dept_accuracy[i]),
+                    'severity_accuracy': float(severity_accuracy[i]),
+                    'keyword_accuracy': float(keyword_accuracy[i]),
+                    'predicted': {
+                        'departments': predictions[i][0],
+                        'severity': predictions[i][1],
+                        'keywords': predictions[i][2]
+                    },
+                    'expected': expected[i]
+                } for i in range(len(test_cases))
+            ]
         }
-        
+
+    def run_accuracy_test(self, test_file: str = DEFAULT_TEST_FILE, render_chart: bool = True,
+                          use_cache: bool = True) -> Dict:
+        ruleset = get_ruleset()
+        key = self.cache_key(test_file, ruleset)
+        report = self.cache.get(key) if use_cache else None
+        if report is None:
+            test_cases = self.load_test_cases(test_file)
+            if not test_cases:
+                raise ValueError(f"No test cases in {test_file}")
+            report = self.evaluate(test_cases, ruleset)
+            report.update({
+                'case_count': len(test_cases),
+                'corpus_hash': self.corpus_hash(test_file),
+                'ruleset_version': ruleset.version
+            })
+            self.cache.put(key, report)
+
         # Save visualizations
-        self._generate_visualizations(results)
-        
+        if render_chart:
+            self.render_chart(report)
+
         return report
 
-    def _generate_visualizations(self, results: List[Dict]):
+    def render_chart(self, report: Dict, path: str = CHART_FILE):
+        """Bar chart of the component accuracies; slow, so callers may run it in the background"""
+        # Plotting libraries are heavy; load them only when a chart is rendered
+        import matplotlib
+        matplotlib.use('Agg')
+        import seaborn as sns
+        import matplotlib.pyplot as plt
+
         # Create accuracy comparison chart
         metrics = ['Department', 'Severity', 'Keyword']
         values = [
-            sum(r['department_accuracy'] for r in results) / len(results),
-            sum(r['severity_accuracy'] for r in results) / len(results),
-            sum(r['keyword_accuracy'] for r in results) / len(results)
+            report['metrics']['department_accuracy'],
+            report['metrics']['severity_accuracy'],
+            report['metrics']['keyword_accuracy']
         ]
-        
+
         plt.figure(figsize=(10, 6))
         sns.barplot(x=metrics, y=values)
         plt.title('Accuracy by Component')
         plt.ylabel('Accuracy Score')
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        plt.savefig(os.path.join(base_path, 'test_documents', 'accuracy_metrics.png'))
+        plt.savefig(path)
         plt.close()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Score the alert detector against a labelled corpus")
+    parser.add_argument('--test-file', default=DEFAULT_TEST_FILE, help="JSON or JSONL file of labelled cases")
+    parser.add_argument('--no-chart', action='store_true')
+    args = parser.parse_args()
+
     tester = AccuracyTester()
-    results = tester.run_accuracy_test()
+    results = tester.run_accuracy_test(args.test_file, render_chart=not args.no_chart)
     print("\n=== Accuracy Test Results ===")
-    print(f"Overall Accuracy: {results['overall_accuracy']:.2%}")
+    print(f"Overall Accuracy: {results['overall_accuracy']:.2%} over {results['case_count']} cases "
+          f"(ruleset {results['ruleset_version']})")
     print("\nComponent Accuracies:")
     for metric, value in results['metrics'].items():
         print(f"{metric}: {value:.2%}")
-    print("\nVisualization saved as 'accuracy_metrics.png'")
\ No newline at end of file
+    print("\nPer Department:")
+    for dept, scores in results['per_department'].items():
+        print(f"{dept:12} precision {scores['precision']:.2%}  recall {scores['recall']:.2%}  "
+              f"f1 {scores['f1']:.2%}  support {scores['support']}")
+    if not args.no_chart:
+        print("\nVisualization saved as 'accuracy_metrics.png'")
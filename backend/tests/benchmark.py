@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import sys
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+# Must be set before any app module creates the shared result cache:
+# with no cache every upload does the full processing
+os.environ['RESULT_CACHE_SIZE'] = '0'
+os.environ.pop('RESULT_CACHE_DIR', None)
+sys.path.append(BACKEND_DIR)
+from tests.corpus_generator import generate_corpus, SIZES, FORMATS
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'tests', 'benchmark_results')
+UPLOAD_MIME_TYPES = {
+    'txt': 'text/plain',
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+
+def time_call(func: Callable[[], object], runs: int, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'runs': runs,
+        'min_ms': timings[0],
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        'max_ms': timings[-1]
+    }
+
+
+def load_root_app(work_dir: str):
+    """Import the root app.py (home of scan_for_alerts) without clashing with the backend `app` package"""
+    os.environ.setdefault('DOCUMENTS_DB', os.path.join(work_dir, 'documents.db'))
+    if REPO_DIR not in sys.path:
+        sys.path.append(REPO_DIR)
+    spec = importlib.util.spec_from_file_location('root_app', os.path.join(REPO_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_detector(corpus: List[Dict], texts: Dict[str, str], runs: int) -> List[Dict]:
+    from app.processor.alert_detector import AlertDetector
+    detector = AlertDetector()
+    results = []
+    for entry in corpus:
+        if entry['format'] != 'txt':
+            continue
+        text = texts[entry['path']]
+        results.append({'benchmark': 'detect_alerts', 'size': entry['size'], 'format': 'text',
+                        'input_bytes': entry['text_bytes'],
+                        **time_call(lambda: detector.detect_alerts(text), runs)})
+    return results
+
+
+def bench_scan(corpus: List[Dict], texts: Dict[str, str], runs: int, work_dir: str) -> List[Dict]:
+    root_app = load_root_app(work_dir)
+    loop = asyncio.new_event_loop()
+    results = []
+    for entry in corpus:
+        if entry['format'] != 'txt':
+            continue
+        text = texts[entry['path']]
+        results.append({'benchmark': 'scan_for_alerts', 'size': entry['size'], 'format': 'text',
+                        'input_bytes': entry['text_bytes'],
+                        **time_call(lambda: loop.run_until_complete(root_app.scan_for_alerts([text], 'bench.txt')), runs)})
+    loop.close()
+    return results
+
+
+def bench_parser(corpus: List[Dict], runs: int) -> List[Dict]:
+    from app.processor.document_parser import DocumentParser
+    parser = DocumentParser()
+    return [
+        {'benchmark': 'parse', 'size': entry['size'], 'format': entry['format'], 'input_bytes': entry['file_bytes'],
+         **time_call(lambda: parser.parse(entry['path']), runs)}
+        for entry in corpus
+    ]
+
+
+def bench_upload(corpus: List[Dict], runs: int, work_dir: str) -> List[Dict]:
+    os.environ.setdefault('HISTORY_DB', os.path.join(work_dir, 'history.db'))
+    os.environ.setdefault('JOB_QUEUE_DB', os.path.join(work_dir, 'jobs.db'))
+    os.environ.setdefault('SEARCH_INDEX_DB', os.path.join(work_dir, 'search.db'))
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    results = []
+    with TestClient(app) as client:
+        for entry in corpus:
+            with open(entry['path'], 'rb') as f:
+                payload = f.read()
+            files = {'file': (os.path.basename(entry['path']), payload, UPLOAD_MIME_TYPES[entry['format']])}
+
+            def upload():
+                response = client.post('/upload/', files=files)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/upload/ returned {response.status_code}: {response.text[:200]}")
+
+            results.append({'benchmark': 'upload', 'size': entry['size'], 'format': entry['format'],
+                            'input_bytes': entry['file_bytes'], **time_call(upload, runs)})
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(runs: int = 5, sizes: List[str] = None, formats: List[str] = None, seed: int = 0,
+                   benchmarks: List[str] = None) -> Dict:
+    from app.processor.ruleset import get_ruleset
+    benchmarks = benchmarks or ['detect_alerts', 'scan_for_alerts', 'parse', 'upload']
+    with tempfile.TemporaryDirectory(prefix='kmrl-bench-') as work_dir:
+        corpus = generate_corpus(os.path.join(work_dir, 'corpus'), sizes, formats, seed)
+        # Detector benchmarks need the plain text of every size, whatever formats were requested
+        text_corpus = generate_corpus(os.path.join(work_dir, 'text'), sizes, ['txt'], seed)
+        texts = {}
+        for entry in text_corpus:
+            with open(entry['path'], 'r', encoding='utf-8') as f:
+                texts[entry['path']] = f.read()
+
+        results = []
+        if 'detect_alerts' in benchmarks:
+            results += bench_detector(text_corpus, texts, runs)
+        if 'scan_for_alerts' in benchmarks:
+            results += bench_scan(text_corpus, texts, runs, work_dir)
+        if 'parse' in benchmarks:
+            results += bench_parser(corpus, runs)
+        if 'upload' in benchmarks:
+            results += bench_upload(corpus, runs, work_dir)
+
+    for result in results:
+        result['mb_per_s'] = result['input_bytes'] / 1e6 / (result['median_ms'] / 1000) if result['median_ms'] else None
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': git_revision(),
+            'ruleset_version': get_ruleset().version,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'runs': runs,
+            'seed': seed
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """Median change per benchmark relative to a previous results file"""
+    previous = {(r['benchmark'], r['size'], r['format']): r for r in baseline['results']}
+    lines = []
+    for result in current['results']:
+        before = previous.get((result['benchmark'], result['size'], result['format']))
+        if before and before['median_ms']:
+            change = (result['median_ms'] - before['median_ms']) / before['median_ms']
+            lines.append(f"{result['benchmark']:16} {result['size']:7} {result['format']:5} "
+                         f"{before['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms ({change:+.1%})")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark detection, parsing and the upload flow")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--benchmarks', nargs='+', choices=['detect_alerts', 'scan_for_alerts', 'parse', 'upload'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="results file (default: tests/benchmark_results/<timestamp>.json)")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.runs, args.sizes, args.formats, args.seed, args.benchmarks)
+
+    print("\n=== Benchmark Results (median) ===")
+    for result in report['results']:
+        throughput = f"{result['mb_per_s']:8.2f} MB/s" if result['mb_per_s'] else ''
+        print(f"{result['benchmark']:16} {result['size']:7} {result['format']:5} {result['median_ms']:10.2f} ms {throughput}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print("\n=== Compared to", args.compare, "===")
+            print('\n'.join(compare(report, json.load(f))))
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
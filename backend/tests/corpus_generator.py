@@ -0,0 +1,151 @@
+import argparse
+import random
+import sys
+import os
+from typing import Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.processor.ruleset import get_ruleset
+
+# Vocabulary for KMRL (Kochi Metro) style operations and maintenance reports
+STATIONS = ['Aluva', 'Pulinchodu', 'Companypady', 'Ambattukavu', 'Muttom', 'Kalamassery', 'Cochin University',
+            'Pathadipalam', 'Edapally', 'Changampuzha Park', 'Palarivattom', 'JLN Stadium', 'Kaloor', 'Town Hall',
+            'MG Road', 'Maharaja College', 'Ernakulam South', 'Kadavanthra', 'Elamkulam', 'Vyttila', 'Thykoodam',
+            'Petta', 'Vadakkekotta', 'SN Junction', 'Tripunithura']
+ASSETS = ['traction substation', 'signalling cabinet', 'rolling stock unit', 'escalator', 'AFC gate',
+          'track circuit', 'overhead equipment', 'platform screen door', 'lift', 'UPS room', 'depot crane',
+          'CCTV network', 'ventilation fan', 'point machine', 'axle counter']
+ROLES = ['station controller', 'maintenance supervisor', 'depot engineer', 'customer relations officer',
+         'train operator', 'finance officer', 'HR executive', 'safety officer']
+TEMPLATES = [
+    "The {role} at {station} station logged an observation on the {asset} during the {shift} shift.",
+    "Inspection of the {asset} between {station} and {station2} was completed as per the schedule.",
+    "Passenger footfall at {station} was {count} during the {shift} peak, within the planned capacity.",
+    "Work order {order} raised for the {asset} at {station} has been assigned to the {role}.",
+    "The {role} confirmed that the {asset} at {station} is operating within normal parameters.",
+    "Minutes of the coordination meeting at {station} were circulated to the {role} for records.",
+    "Spare parts for the {asset} were received at the Muttom depot and entered in the inventory.",
+]
+SHIFTS = ['morning', 'afternoon', 'night']
+
+ALERT_KEYWORDS = sorted({
+    keyword
+    for labels in get_ruleset().vocabularies.values()
+    for keywords in labels.values()
+    for keyword in keywords
+})
+
+SIZES = {'small': 2 * 1024, 'medium': 64 * 1024, 'large': 1024 * 1024}
+FORMATS = ['txt', 'pdf', 'docx']
+
+
+def generate_text(size_bytes: int, seed: int = 0, keyword_density: float = 0.2) -> str:
+    """Deterministic report text of about size_bytes; keyword_density is the share of sentences carrying an alert keyword"""
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    length = 0
+    while length < size_bytes:
+        station, station2 = rng.sample(STATIONS, 2)
+        sentence = rng.choice(TEMPLATES).format(
+            role=rng.choice(ROLES), station=station, station2=station2, asset=rng.choice(ASSETS),
+            shift=rng.choice(SHIFTS), count=rng.randint(800, 40000), order=f"WO-{rng.randint(10000, 99999)}"
+        )
+        if rng.random() < keyword_density:
+            sentence += f" Note: {rng.choice(ALERT_KEYWORDS)} reported by the {rng.choice(ROLES)}."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+        if rng.random() < 0.15:
+            sentences.append('\n')
+    return ' '.join(sentences)
+
+
+def write_txt(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _wrap(text: str, width: int = 95) -> List[str]:
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for word in paragraph.split():
+            if line and len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+    return lines
+
+
+def write_pdf(path: str, text: str, lines_per_page: int = 60):
+    """Minimal multi-page PDF with a Helvetica text layer, readable by PyPDF2"""
+    lines = _wrap(text)
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * index for index in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for page_id, page_lines in zip(page_ids, pages):
+        escaped = [line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') for line in page_lines]
+        stream = "BT /F1 9 Tf 40 800 Td 12 TL " + ' '.join(f"({line}) '" for line in escaped) + " ET"
+        stream = stream.encode('latin-1', errors='replace')
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode())
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def write_docx(path: str, text: str):
+    import docx
+    document = docx.Document()
+    for paragraph in text.split('\n'):
+        if paragraph.strip():
+            document.add_paragraph(paragraph.strip())
+    document.save(path)
+
+
+WRITERS = {'txt': write_txt, 'pdf': write_pdf, 'docx': write_docx}
+
+
+def generate_corpus(out_dir: str, sizes: List[str] = None, formats: List[str] = None, seed: int = 0) -> List[Dict]:
+    """Write one document per (size, format) and return their descriptions"""
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for size_index, size in enumerate(sizes or list(SIZES)):
+        text = generate_text(SIZES[size], seed=seed + size_index)
+        for file_format in formats or FORMATS:
+            path = os.path.join(out_dir, f"kmrl_{size}.{file_format}")
+            WRITERS[file_format](path, text)
+            corpus.append({
+                'path': path,
+                'format': file_format,
+                'size': size,
+                'text_bytes': len(text.encode('utf-8')),
+                'file_bytes': os.path.getsize(path)
+            })
+    return corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic KMRL-style document corpus")
+    parser.add_argument('out_dir')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for entry in generate_corpus(args.out_dir, args.sizes, args.formats, args.seed):
+        print(f"{entry['path']}: {entry['file_bytes']} bytes")
@@ -0,0 +1,79 @@
+import argparse
+import subprocess
+import sys
+import os
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time allowed for the serving entry point
+DEFAULT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 600))
+
+# Heavy dependencies that must stay off the startup path
+FORBIDDEN_MODULES = [
+    'pandas', 'sklearn', 'seaborn', 'matplotlib', 'magic', 'opensearchpy',
+    'aiohttp', 'transformers', 'torch', 'pytesseract', 'pypdfium2'
+]
+
+
+def measure_imports(module: str, runs: int = 3) -> Tuple[float, Dict[str, float]]:
+    """Import `module` in fresh interpreters with -X importtime.
+
+    Returns the best total in milliseconds and the cumulative time of every
+    module imported in that run.
+    """
+    best_total, best_modules = None, {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+        modules = {}
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(cumulative) / 1000
+        total = modules.get(module, 0.0)
+        if best_total is None or total < best_total:
+            best_total, best_modules = total, modules
+    return best_total, best_modules
+
+
+def check_import_budget(module: str = 'app.main', budget_ms: float = DEFAULT_BUDGET_MS,
+                        runs: int = 3, top: int = 10) -> List[str]:
+    total, modules = measure_imports(module, runs)
+    failures = []
+
+    print(f"\n=== Import Time: {module} ===")
+    print(f"Total: {total:.1f} ms (budget {budget_ms:.0f} ms)")
+    print("\nSlowest top-level imports:")
+    top_level = {name: ms for name, ms in modules.items() if '.' not in name}
+    for name, ms in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{ms:9.1f} ms  {name}")
+
+    if total > budget_ms:
+        failures.append(f"importing {module} took {total:.1f} ms, over the {budget_ms:.0f} ms budget")
+    for name in FORBIDDEN_MODULES:
+        if name in modules:
+            failures.append(f"{name} is imported at startup ({modules[name]:.1f} ms)")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when backend startup imports regress")
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=3, help="best of N fresh interpreters")
+    args = parser.parse_args()
+
+    failures = check_import_budget(args.module, args.budget_ms, args.runs)
+    if failures:
+        print("\nImport budget check FAILED:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+    print("\nImport budget check passed")
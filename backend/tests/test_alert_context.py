@@ -0,0 +1,86 @@
+import asyncio
+import importlib.util
+import os
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.processor.context import ContextCollector
+from app.processor.keyword_matcher import KeywordHit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def collect(collector, text, *keywords, label='safety'):
+    hits = sorted((KeywordHit(keyword, 'department', label, match.start(), match.end())
+                   for keyword in keywords for match in re.finditer(keyword, text)), key=lambda hit: hit.start)
+    for hit in hits:
+        collector.add(label, hit, text)
+    return collector.snippets(label)
+
+
+def test_each_keyword_yields_at_most_per_keyword_snippets():
+    # Sentences far apart, so no two windows merge
+    text = ('Fire in hall B. ' + 'Nothing to report here. ' * 10) * 200
+    collector = ContextCollector(window=40, per_keyword=3)
+    snippets = collect(collector, text, 'Fire', 'hall')
+    assert [snippet['text'] for snippet in snippets] == ['Fire in hall B.'] * 3
+    assert all(snippet['keywords'] == ['Fire', 'hall'] for snippet in snippets)
+
+
+def test_repeats_inside_a_snippet_do_not_use_up_the_cap():
+    text = 'Fire, fire and more fire on deck 2. ' + 'Nothing to report here. ' * 10 + 'A second fire on deck 5.'
+    collector = ContextCollector(window=40, per_keyword=2)
+    snippets = collect(collector, text, '(?i:fire)')
+    assert [snippet['text'] for snippet in snippets] == ['Fire, fire and more fire on deck 2.', 'A second fire on deck 5.']
+
+
+def test_adjacent_hits_merge_up_to_max_length():
+    text = ''.join(f"Fire at dock {n:02}. " for n in range(12))
+    collector = ContextCollector(window=20, per_keyword=100, max_length=60)
+    snippets = collect(collector, text, 'Fire')
+    assert [snippet['text'] for snippet in snippets] == [
+        ' '.join(f"Fire at dock {n:02}." for n in range(first, first + 3)) for first in range(0, 12, 3)
+    ]
+    assert all(snippet['end'] - snippet['start'] <= 60 for snippet in snippets)
+    # Snippets follow each other without gaps or overlaps
+    assert all(a['end'] == b['start'] for a, b in zip(snippets, snippets[1:]))
+
+
+def test_output_stays_bounded_for_a_noisy_document():
+    text = 'Urgent fire hazard, evacuate now! ' * 20000
+    collector = ContextCollector(per_keyword=3, max_length=600)
+    snippets = collect(collector, text, 'fire', 'hazard', 'evacuate')
+    assert len(snippets) <= 3 * 3
+    assert sum(len(snippet['text']) for snippet in snippets) <= 3 * 3 * 600
+
+
+@pytest.fixture
+def root_app(tmp_path, monkeypatch):
+    """The root app.py, with its history store and uploads under tmp_path"""
+    monkeypatch.syspath_prepend(REPO_DIR)
+    monkeypatch.setenv('DOCUMENTS_DB', str(tmp_path / 'documents.db'))
+    spec = importlib.util.spec_from_file_location('root_app', os.path.join(REPO_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, 'UPLOAD_DIR', str(tmp_path))
+    yield module
+    module.history_store.close()
+
+
+def test_root_app_records_alert_context(root_app):
+    text = 'Routine inspection of the warehouse. There is an urgent leak in bay 4. Please review the logs.'
+    # Split mid-keyword, so the context has to be cut across chunks
+    split = text.index('urgent') + 3
+    scan = asyncio.run(root_app.scan_for_alerts([text[:split], text[split:]], 'leak.txt'))
+    assert {alert['keyword']: alert['context'] for alert in scan['alerts']} == {
+        'urgent': 'There is an urgent leak in bay 4.',
+        'review': 'Please review the logs.'
+    }
+
+    response = TestClient(root_app.app).post('/api/upload', files=[('files', ('leak.txt', text.encode(), 'text/plain'))])
+    assert response.status_code == 200
+    stored = root_app.history_store.get('leak.txt')
+    assert stored['alerts'] == scan['alerts']
+    assert all(alert['severity'] and alert['context'] for alert in stored['alerts'])
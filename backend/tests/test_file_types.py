@@ -0,0 +1,67 @@
+import importlib
+import io
+
+import docx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.processor.file_types import (
+    FILE_TYPES, SNIFF_BYTES, UnsupportedFileType, resolve_file_type, sniff_file_type, sniff_path
+)
+
+DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Stores and spooled uploads stay under tmp_path; startup is not run, since
+    # nothing here gets past the upload itself
+    for name, file_name in [('HISTORY_DB', 'history.db'), ('SEARCH_INDEX_DB', 'search.db'),
+                            ('JOB_QUEUE_DB', 'jobs.db'), ('JOB_SPOOL_DIR', 'queue')]:
+        monkeypatch.setenv(name, str(tmp_path / file_name))
+    monkeypatch.chdir(tmp_path)
+    return TestClient(importlib.import_module('app.main').app)
+
+
+def uploaded_files(tmp_path):
+    uploads = tmp_path / 'uploads'
+    return sorted(path.name for path in uploads.rglob('*')) if uploads.exists() else []
+
+
+def make_docx() -> bytes:
+    document = docx.Document()
+    for line in range(300):
+        document.add_paragraph(f"Line {line} of a safety report about a fire hazard.")
+    data = io.BytesIO()
+    document.save(data)
+    return data.getvalue()
+
+
+def test_disallowed_content_is_rejected_before_anything_is_written(client, tmp_path):
+    # A gzip archive renamed to .txt
+    response = client.post('/upload/', files={'file': ('notes.txt', b'\x1f\x8b\x08\x00' + b'\x00' * 64, 'text/plain')})
+    assert response.status_code == 400
+    assert 'application/gzip' in response.json()['detail']
+    assert uploaded_files(tmp_path) == []
+
+
+def test_docx_is_recognised_from_its_leading_bytes():
+    data = make_docx()
+    assert len(data) > SNIFF_BYTES
+    assert sniff_file_type(data[:SNIFF_BYTES]).mime_type == DOCX
+
+
+def test_unknown_content_raises_unsupported_file_type():
+    with pytest.raises(UnsupportedFileType) as error:
+        sniff_file_type(b'\x1f\x8b\x08\x00' + b'\x00' * 64)
+    assert error.value.mime_type == 'application/gzip'
+
+
+def test_sniffed_type_wins_over_a_misleading_extension(tmp_path):
+    path = tmp_path / 'report.pdf'
+    path.write_text('Plain text that only claims to be a PDF.')
+    sniffed = sniff_path(str(path))
+    assert sniffed is FILE_TYPES['text/plain']
+    assert resolve_file_type(str(path), sniffed.mime_type).parser == 'text'
+    # Without a sniffed type the extension decides
+    assert resolve_file_type(str(path)).parser == 'pdf'
@@ -0,0 +1,177 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.history_store import JsonlHistoryStore, SQLiteHistoryStore, severity_rank, timestamp_to_us
+
+SEVERITIES = ['critical', 'high', 'medium', 'low', None]
+DEPARTMENTS = ['safety', 'maintenance', 'hr']
+KEYWORDS = ['fire', 'hazard', 'repair', 'staff']
+START = datetime(2024, 3, 1, 9, 0, 0)
+
+
+@pytest.fixture(params=['sqlite', 'jsonl'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    else:
+        store = JsonlHistoryStore(str(tmp_path / 'history.jsonl'))
+    yield store
+    store.close()
+
+
+def make_documents(count, seed=0):
+    rng = random.Random(seed)
+    documents = []
+    for index in range(count):
+        departments = rng.sample(DEPARTMENTS, rng.randint(0, 2))
+        documents.append({
+            'file_name': f"doc{index:03}",
+            # Few distinct timestamps, so most documents tie with others on time
+            'timestamp': (START + timedelta(hours=rng.randint(0, 5))).isoformat(),
+            'highest_severity': rng.choice(SEVERITIES),
+            'departments': [{'id': dept, 'name': f"{dept.title()} Department"} for dept in departments],
+            'alerts': [{'department': dept, 'keywords': rng.sample(KEYWORDS, 1)} for dept in departments]
+        })
+    return documents
+
+
+def fill(store, documents):
+    for document in documents:
+        store.put(document, key=document['file_name'])
+
+
+def expected_order(documents):
+    """Most severe first, newest first, most recently inserted first among ties"""
+    return [document['file_name'] for _, document in sorted(
+        enumerate(documents),
+        key=lambda item: (severity_rank(item[1]['highest_severity']), -timestamp_to_us(item[1]['timestamp']), -item[0])
+    )]
+
+
+def walk(store, limit, **filters):
+    names, cursor, pages = [], None, 0
+    while True:
+        page, cursor = store.query(limit=limit, cursor=cursor, **filters)
+        assert len(page) <= limit
+        names.extend(document['file_name'] for document in page)
+        pages += 1
+        if cursor is None:
+            return names, pages
+        assert len(page) == limit
+
+
+@pytest.mark.parametrize('limit', [1, 3, 7, 50, 500])
+def test_pages_cover_every_document_once_in_order(store, limit):
+    documents = make_documents(120)
+    fill(store, documents)
+    names, pages = walk(store, limit)
+    assert names == expected_order(documents)
+    assert pages == max(1, -(-len(documents) // limit))
+
+
+def test_equal_timestamps_page_by_insertion_order(store):
+    documents = [{'file_name': f"tie{index}", 'timestamp': START.isoformat(), 'highest_severity': 'high'}
+                 for index in range(10)]
+    fill(store, documents)
+    names, _ = walk(store, 3)
+    assert names == [f"tie{index}" for index in reversed(range(10))]
+
+
+def test_replacing_a_document_keeps_its_place_among_ties(store):
+    documents = make_documents(40, seed=1)
+    fill(store, documents)
+    documents[5] = dict(documents[5], highest_severity='critical')
+    store.put(documents[5], key=documents[5]['file_name'])
+    names, _ = walk(store, 4)
+    assert names == expected_order(documents)
+
+
+def test_empty_store_has_one_empty_page(store):
+    assert store.query(limit=5) == ([], None)
+
+
+def test_invalid_cursor(store):
+    with pytest.raises(ValueError):
+        store.query(cursor='not-a-cursor')
+
+
+def matches(document, severities=None, department=None, keyword=None, since=None, until=None):
+    if severities and (document['highest_severity'] or '') not in severities:
+        return False
+    if department and department not in {alert['department'] for alert in document['alerts']}:
+        return False
+    if keyword and keyword not in {kw for alert in document['alerts'] for kw in alert['keywords']}:
+        return False
+    timestamp = datetime.fromisoformat(document['timestamp'])
+    return (since is None or timestamp >= since) and (until is None or timestamp <= until)
+
+
+FILTERS = [
+    {'severities': ['critical']},
+    {'severities': ['high', 'low']},
+    {'department': 'safety'},
+    {'keyword': 'hazard'},
+    {'since': START + timedelta(hours=2)},
+    {'until': START + timedelta(hours=3)},
+    {'since': START + timedelta(hours=1), 'until': START + timedelta(hours=1)},
+    {'severities': ['critical', 'high'], 'department': 'maintenance', 'keyword': 'repair',
+     'since': START + timedelta(hours=1), 'until': START + timedelta(hours=4)},
+]
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_filters_match_brute_force(store, filters):
+    documents = make_documents(150, seed=2)
+    fill(store, documents)
+    expected = [name for name in expected_order(documents)
+                if matches(next(d for d in documents if d['file_name'] == name), **filters)]
+    assert expected
+    names, _ = walk(store, 4, **filters)
+    assert names == expected
+
+
+def test_department_filter_accepts_names_and_ids(store):
+    fill(store, make_documents(30, seed=3))
+    by_id, _ = walk(store, 10, department='safety')
+    by_name, _ = walk(store, 10, department='Safety Department')
+    assert by_id and by_id == by_name
+
+
+def test_timezone_aware_bounds_match_local_timestamps(store):
+    documents = make_documents(60, seed=4)
+    fill(store, documents)
+    since = START + timedelta(hours=2)
+    # The same instant as the naive local bound, expressed in UTC
+    aware_since = since.astimezone().astimezone(timezone.utc)
+    assert walk(store, 5, since=aware_since) == walk(store, 5, since=since)
+
+
+def test_unknown_severity_is_rejected(store):
+    fill(store, make_documents(5))
+    with pytest.raises(ValueError):
+        store.query(severities=['urgent'])
+
+
+@pytest.mark.parametrize('filters, index', [
+    ({}, 'idx_documents_order'),
+    ({'since': START}, 'idx_documents_order'),
+    ({'department': 'safety'}, 'idx_document_departments_order'),
+    ({'keyword': 'fire', 'until': START}, 'idx_document_keywords_order'),
+    ({'department': 'hr', 'keyword': 'staff'}, 'idx_document_departments_order'),
+])
+def test_filtered_pages_are_index_range_scans(tmp_path, filters, index):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    fill(store, make_documents(50, seed=5))
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+    store.query(limit=5, **filters)
+    store._conn.set_trace_callback(None)
+    assert statements
+    for statement in statements:
+        plan = [row[3] for row in store._conn.execute('EXPLAIN QUERY PLAN ' + statement)]
+        # Driven by a seek on the ordered index, never a scan of the history or a sort
+        assert plan[0].startswith(f"SEARCH f USING COVERING INDEX {index} (")
+        assert not any(step.startswith('SCAN') or 'TEMP B-TREE' in step for step in plan)
+    store.close()
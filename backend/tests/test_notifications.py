@@ -0,0 +1,97 @@
+import asyncio
+
+from app.utils.notifications import DeliveryError, Notification, NotificationDispatcher
+
+
+class FakeTransport:
+    """Records every batch; the first `failures` batches fail after `fail_after` messages were sent"""
+
+    def __init__(self, failures: int = 0, fail_after: int = 0):
+        self.failures = failures
+        self.fail_after = fail_after
+        self.attempts = []
+        self.delivered = []
+
+    def send(self, messages):
+        self.attempts.append([message['To'] for message in messages])
+        if self.failures > 0:
+            self.failures -= 1
+            self.delivered.extend(messages[:self.fail_after])
+            raise DeliveryError(self.fail_after, ConnectionResetError('connection lost'))
+        self.delivered.extend(messages)
+
+
+def alert(recipient, keyword, severity='high'):
+    return Notification(recipient=recipient, department=recipient.split('@')[0].title(), severity=severity,
+                        keywords=[keyword], file_name=f"{keyword}.txt")
+
+
+def dispatcher(transport, **kwargs):
+    options = dict(window=0.05, rate_limit=10, rate_period=60, max_retries=3, retry_backoff=0.01)
+    options.update(kwargs)
+    return NotificationDispatcher(transport, **options)
+
+
+def test_alerts_coalesce_into_one_digest_per_recipient():
+    async def scenario():
+        transport = FakeTransport()
+        notifier = dispatcher(transport)
+        notifier.submit([alert('safety@x', 'fire'), alert('hr@x', 'staff')])
+        notifier.submit([alert('safety@x', 'hazard', 'critical'), alert('safety@x', 'chemical')])
+        await asyncio.sleep(0.2)
+        # One batch over one connection, one digest per recipient
+        assert transport.attempts == [['safety@x', 'hr@x']]
+        safety = next(m for m in transport.delivered if m['To'] == 'safety@x')
+        assert safety['Subject'] == '[CRITICAL] 3 alerts for Safety'
+        body = safety.get_content()
+        assert all(f"{keyword}.txt" in body for keyword in ('fire', 'hazard', 'chemical'))
+        await notifier.stop()
+    asyncio.run(scenario())
+
+
+def test_partial_delivery_resends_only_the_rest():
+    async def scenario():
+        transport = FakeTransport(failures=1, fail_after=1)
+        notifier = dispatcher(transport)
+        notifier.submit([alert('a@x', 'fire'), alert('b@x', 'fire'), alert('c@x', 'fire')])
+        await notifier.stop()
+        assert transport.attempts == [['a@x', 'b@x', 'c@x'], ['b@x', 'c@x']]
+        assert sorted(m['To'] for m in transport.delivered) == ['a@x', 'b@x', 'c@x']
+    asyncio.run(scenario())
+
+
+def test_retries_back_off_and_give_up():
+    async def scenario():
+        transport = FakeTransport(failures=10)
+        notifier = dispatcher(transport, max_retries=2, retry_backoff=0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        notifier.submit([alert('a@x', 'fire')])
+        await notifier.stop()
+        # Backoff of 0.05s and then 0.1s between the three attempts
+        assert loop.time() - started >= 0.15
+        assert len(transport.attempts) == 3
+        assert not transport.delivered
+        assert notifier.depth() == 0
+    asyncio.run(scenario())
+
+
+def test_rate_limited_recipient_is_held():
+    async def scenario():
+        transport = FakeTransport()
+        notifier = dispatcher(transport, rate_limit=1, rate_period=60)
+        notifier.submit([alert('a@x', 'fire'), alert('b@x', 'fire')])
+        await asyncio.sleep(0.15)
+        notifier.submit([alert('a@x', 'hazard'), alert('a@x', 'chemical'), alert('b@x', 'smoke')])
+        await asyncio.sleep(0.3)
+        # Both recipients used up their one digest; the later alerts wait
+        assert len(transport.delivered) == 2
+        assert notifier.depth() == 3
+
+        # Shutdown delivers what was held, still one digest per recipient
+        await notifier.stop()
+        assert len(transport.attempts) == 2
+        held = {m['To']: m for m in transport.delivered[2:]}
+        assert held['a@x']['Subject'] == '[HIGH] 2 alerts for A'
+        assert held['b@x']['Subject'] == '[HIGH] 1 alert for B'
+    asyncio.run(scenario())
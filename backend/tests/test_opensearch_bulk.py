@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from opensearchpy import AsyncOpenSearch
+from opensearchpy.exceptions import TransportError
+
+from app.utils.opensearch_client import BulkIndexer, OpenSearchClient
+
+
+class FakeOpenSearch:
+    """Minimal OpenSearch over HTTP: index exists checks and `_bulk`.
+
+    The next `fail_requests` bulk requests answer with `fail_status`, and
+    documents with a `bad` field are rejected item by item.
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.bulk_requests = 0
+        self.fail_requests = 0
+        self.fail_status = 503
+
+    async def bulk(self, request: web.Request) -> web.Response:
+        self.bulk_requests += 1
+        if self.fail_requests > 0:
+            self.fail_requests -= 1
+            return web.json_response({'error': 'unavailable', 'status': self.fail_status}, status=self.fail_status)
+        lines = [json.loads(line) for line in (await request.text()).splitlines() if line.strip()]
+        items = []
+        for header, source in zip(lines[::2], lines[1::2]):
+            meta = header['index']
+            if source.get('bad'):
+                items.append({'index': {'_index': meta['_index'], '_id': meta['_id'], 'status': 400,
+                                        'error': {'type': 'mapper_parsing_exception'}}})
+                continue
+            self.documents[meta['_id']] = source
+            items.append({'index': {'_index': meta['_index'], '_id': meta['_id'], 'status': 201}})
+        return web.json_response({'took': 1, 'errors': any(i['index']['status'] >= 300 for i in items), 'items': items})
+
+    async def index_exists(self, request: web.Request) -> web.Response:
+        return web.Response(status=200)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/_bulk', self.bulk)
+        # The async client sends HEAD requests as GET
+        app.router.add_get('/{index}', self.index_exists)
+        return app
+
+
+def run_with_server(scenario):
+    async def main():
+        fake = FakeOpenSearch()
+        runner = web.AppRunner(fake.app())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        # No transport-level retries, so every attempt is the indexer's own
+        client = AsyncOpenSearch(hosts=[{'host': '127.0.0.1', 'port': port}], max_retries=0)
+        try:
+            return await scenario(fake, client, port)
+        finally:
+            await client.close()
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def test_transport_errors_are_retried_without_duplicates():
+    async def scenario(fake, client, port):
+        indexer = BulkIndexer(client, flush_interval=60, retries=3, retry_backoff=0.01)
+        outcomes = [await indexer.add('alerts', {'n': n}) for n in range(5)]
+        fake.fail_requests = 2
+        result = await indexer.flush()
+        assert result.indexed == 5 and not result.failed
+        assert fake.bulk_requests == 3
+        assert sorted(doc['n'] for doc in fake.documents.values()) == list(range(5))
+        assert all(future.result()[0] for future in outcomes)
+        await indexer.close()
+    run_with_server(scenario)
+
+
+def test_failed_batch_is_kept_for_the_next_flush():
+    async def scenario(fake, client, port):
+        indexer = BulkIndexer(client, flush_interval=60, retries=1, retry_backoff=0.01)
+        outcomes = [await indexer.add('alerts', {'n': n}) for n in range(3)]
+        fake.fail_requests = 2
+        with pytest.raises(TransportError):
+            await indexer.flush()
+        assert not fake.documents
+        assert not any(future.done() for future in outcomes)
+
+        # Newer actions queue behind the ones that were kept
+        later = await indexer.add('alerts', {'n': 3})
+        result = await indexer.flush()
+        assert result.indexed == 4
+        assert sorted(doc['n'] for doc in fake.documents.values()) == [0, 1, 2, 3]
+        assert all(future.result()[0] for future in outcomes + [later])
+        await indexer.close()
+    run_with_server(scenario)
+
+
+def test_client_errors_are_not_retried():
+    async def scenario(fake, client, port):
+        indexer = BulkIndexer(client, flush_interval=60, retries=3, retry_backoff=0.01)
+        await indexer.add('alerts', {'n': 0})
+        fake.fail_requests, fake.fail_status = 1, 400
+        with pytest.raises(TransportError):
+            await indexer.flush()
+        assert fake.bulk_requests == 1
+        await indexer.close()
+        assert len(fake.documents) == 1
+    run_with_server(scenario)
+
+
+def test_timed_flush_sends_buffered_actions():
+    async def scenario(fake, client, port):
+        indexer = BulkIndexer(client, flush_interval=0.05)
+        outcome = await indexer.add('alerts', {'n': 0})
+        ok, item = await asyncio.wait_for(outcome, 2)
+        assert ok and item['index']['_id'] in fake.documents
+        await indexer.close()
+    run_with_server(scenario)
+
+
+def test_store_documents_reports_only_its_own_items(monkeypatch):
+    async def scenario(fake, client, port):
+        monkeypatch.setenv('OPENSEARCH_HOST', '127.0.0.1')
+        monkeypatch.setenv('OPENSEARCH_PORT', str(port))
+        store = OpenSearchClient()
+        store.bulk.flush_interval = 60
+        # An unrelated alert with a rejected item shares the first batch
+        await store.bulk.add(store.alerts_index, {'bad': True})
+        result = await store.store_documents([{'file_name': 'a.txt'}, {'file_name': 'b.txt', 'bad': True}])
+        assert result.indexed == 1
+        assert [item['index']['_index'] for item in result.failed] == ['documents']
+        await store.close()
+    run_with_server(scenario)
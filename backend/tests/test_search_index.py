@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.search_index import SearchIndex
+
+START = datetime(2024, 3, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    yield index
+    index.close()
+
+
+def add(index, content_hash, text, copies):
+    index.add_text(content_hash, text)
+    index.add_documents([
+        {'document_id': f"{content_hash}-{n:04}", 'content_hash': content_hash, 'file_name': f"{content_hash}.txt",
+         'timestamp': (START + timedelta(minutes=n)).isoformat(), 'highest_severity': 'low'}
+        for n in range(copies)
+    ])
+
+
+def walk(index, query, limit, order='relevance'):
+    ids, offset = [], 0
+    while True:
+        page = index.search(query, limit=limit, offset=offset, order=order)
+        ids.extend(result['document_id'] for result in page[:limit])
+        if len(page) <= limit:
+            return ids
+        offset += limit
+
+
+def test_duplicates_page_newest_first_within_each_text(index):
+    add(index, 'circular', 'Fire drill circular for every department.', 500)
+    add(index, 'memo', 'A short memo mentioning a fire drill.', 3)
+    expected = walk(index, 'fire drill', 10000)
+    assert len(expected) == 503
+    circular = [doc_id for doc_id in expected if doc_id.startswith('circular')]
+    assert circular == sorted(circular, reverse=True)
+    for limit in (1, 7, 50):
+        assert walk(index, 'fire drill', limit) == expected
+    assert walk(index, 'fire drill', 7, order='recent')[:3] == [f"memo-{n:04}" for n in (2, 1, 0)]
+
+
+def test_a_page_reads_only_its_own_rows(index):
+    add(index, 'circular', 'Fire drill circular for every department.', 500)
+    statements = []
+    index._conn.set_trace_callback(statements.append)
+    page = index.search('drill', limit=5, offset=100)
+    index._conn.set_trace_callback(None)
+    assert [result['document_id'] for result in page] == [f"circular-{n:04}" for n in range(399, 393, -1)]
+    for statement in statements:
+        if 'FROM search_documents' in statement:
+            plan = [row[3] for row in index._conn.execute('EXPLAIN QUERY PLAN ' + statement)]
+            assert any('idx_search_documents_order' in step for step in plan)
+            assert not any('TEMP B-TREE' in step for step in plan)
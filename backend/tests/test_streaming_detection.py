@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from app.processor.alert_detector import AlertDetector
+from app.processor.context import ContextCollector
+
+
+@pytest.fixture(scope='module')
+def detector():
+    return AlertDetector()
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def random_text(detector, rng, words=300):
+    vocabulary = detector.matcher.keywords + ['the', 'plant', 'Line 4.', 'Urgent!', '\n', 'fire-hazard', 'repairs']
+    return ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 1000, 10 ** 6])
+def test_stream_matches_in_memory(detector, chunk_size):
+    rng = random.Random(chunk_size)
+    for _ in range(30):
+        text = random_text(detector, rng, rng.randint(0, 400))
+        assert detector.detect_alerts_stream(chunked(text, chunk_size)) == detector.detect_alerts(text)
+
+
+def test_keywords_split_across_chunks(detector):
+    text = 'Routine check. A safety concern was raised: chemical hazard near the equipment. Repair urgently.'
+    expected = detector.detect_alerts(text)
+    assert expected
+    # Split the text once inside every character of every keyword occurrence
+    for hit in detector.matcher.iter_hits(text):
+        for split in range(hit.start + 1, hit.end):
+            assert detector.detect_alerts_stream([text[:split], text[split:]]) == expected
+
+
+def test_contexts_across_chunks(detector):
+    filler = 'Nothing to report here. ' * 20
+    text = filler + 'Evacuation of hall B after a fire alarm.' + filler + 'Chemical spill contained.' + filler
+    expected = detector.detect_alerts(text)
+    safety = next(alert for alert in expected if alert['department'] == 'safety')
+    assert [snippet['keywords'] for snippet in safety['contexts']] == [['evacuation', 'fire'], ['chemical']]
+    # Chunks smaller than the context window
+    for size in (5, ContextCollector().window - 1, ContextCollector().window + 1):
+        assert detector.detect_alerts_stream(chunked(text, size)) == expected
+
+
+def test_empty_stream(detector):
+    assert detector.detect_alerts_stream([]) == detector.detect_alerts('') == []
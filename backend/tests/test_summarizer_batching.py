@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from app.services import summarizer
+from app.services.result_cache import ResultCache
+from app.services.summarizer import SummarizationService
+
+
+class StubSummarizer:
+    """Deterministic backend that records the size and time of every model call"""
+
+    name = 'stub'
+    calls = []
+
+    def tokenize(self, text):
+        return text.split()
+
+    def detokenize(self, tokens):
+        return ' '.join(tokens)
+
+    def summarize_batch(self, texts):
+        StubSummarizer.calls.append((time.monotonic(), len(texts)))
+        return [f"summary of {text.split()[0]}" for text in texts]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setitem(summarizer.SUMMARY_BACKENDS, 'stub', StubSummarizer)
+    StubSummarizer.calls = []
+    return SummarizationService(backend='stub', batch_size=4, batch_wait=0.2, window_tokens=1000,
+                                cache=ResultCache(max_entries=100))
+
+
+def test_concurrent_callers_share_batches_of_at_most_batch_size(service):
+    texts = [f"doc{i} reports a hazard near line {i}." for i in range(10)]
+    results = {}
+
+    def call(text):
+        results[text] = service.summarize(text)
+
+    threads = [threading.Thread(target=call, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # Each caller gets the summary of its own document
+    assert results == {text: f"summary of {text.split()[0]}" for text in texts}
+    sizes = [size for _, size in StubSummarizer.calls]
+    assert sum(sizes) == len(texts)
+    assert max(sizes) == 4 and len(sizes) == 3
+
+
+def test_a_lone_request_waits_at_most_one_window(service):
+    started = time.monotonic()
+    assert service.summarize('alone in its batch.') == 'summary of alone'
+    assert time.monotonic() - started < 1.0
+    assert [size for _, size in StubSummarizer.calls] == [1]
+
+
+def test_requests_after_the_window_form_a_new_batch(service):
+    first = service.submit('early document.')
+    time.sleep(0.4)
+    second = service.submit('late document.')
+    assert (first.result(5), second.result(5)) == ('summary of early', 'summary of late')
+    assert [size for _, size in StubSummarizer.calls] == [1, 1]
+
+
+def test_cached_summaries_skip_the_model(service):
+    assert service.summarize('repeat document.') == 'summary of repeat'
+    assert service.submit('repeat document.').result(0) == 'summary of repeat'
+    assert len(StubSummarizer.calls) == 1
@@ -1,4 +1,6 @@
 from opensearchpy import OpenSearch
+from datetime import datetime, timezone
+import uuid
 from preprocess import extract_text_from_pdf, extract_text_from_docx, extract_text_from_image, summarize, tag_document, translate
 
 client = OpenSearch(
@@ -8,6 +10,18 @@ client = OpenSearch(
     verify_certs=False
 )
 
+# alert_pipeline.py pages through documents by indexing time, then doc_uid
+DOCUMENT_MAPPINGS = {
+    "properties": {
+        "indexed_at": {"type": "date"},
+        "doc_uid": {"type": "keyword"}
+    }
+}
+
+def ensure_index(index="documents"):
+    if not client.indices.exists(index=index):
+        client.indices.create(index=index, body={"mappings": DOCUMENT_MAPPINGS})
+
 def ingest_file(file_path, file_type):
     if file_type == "pdf":
         text = extract_text_from_pdf(file_path)
@@ -22,10 +36,14 @@ def ingest_file(file_path, file_type):
         "summary": summarize(text),
         "tags": tag_document(text),
         "translation": translate(text),
-        "original_text": text
+        "original_text": text,
+        # Set at indexing time, never taken from the document, so new documents always sort last
+        "indexed_at": datetime.now(timezone.utc).isoformat(),
+        "doc_uid": uuid.uuid4().hex
     }
 
-    client.index(index="documents", body=doc)
+    ensure_index()
+    client.index(index="documents", body=doc, id=doc["doc_uid"])
     print(f"Document ingested: {doc}")
 
 # Example run
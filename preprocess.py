@@ -1,20 +1,49 @@
-import pdfplumber
+import os
+from functools import lru_cache
+
 import docx
-from PIL import Image
-import pytesseract
 
-def extract_text_from_pdf(file_path):
-    text = ""
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-    return text
+from backend.app.processor.pdf_extractor import extract_pdf_text
+from backend.app.processor.ocr import ocr_image_file
+from backend.app.processor.ruleset import get_ruleset
+from backend.app.services.summarizer import get_summarization_service
+
+# Optional Hugging Face translation model, e.g. Helsinki-NLP/opus-mt-mul-en; text passes through unchanged without one
+TRANSLATION_MODEL = os.getenv("TRANSLATION_MODEL")
+
+def extract_text_from_pdf(file_path, max_pages=None):
+    # Shares the backend's single PDF backend; scanned pages are OCRed
+    return extract_pdf_text(file_path, max_pages=max_pages)
 
 def extract_text_from_docx(file_path):
     doc = docx.Document(file_path)
     return "\n".join([para.text for para in doc.paragraphs])
 
 def extract_text_from_image(file_path):
-    img = Image.open(file_path)
-    text = pytesseract.image_to_string(img)
-    return text
+    # Normalized, downsampled and cached by page hash in the backend OCR stage
+    return ocr_image_file(file_path)
+
+def summarize(text):
+    # The model stays loaded between calls and concurrent callers are batched together
+    return get_summarization_service().summarize(text)
+
+def tag_document(text):
+    # Department tags from the same ruleset the backend uses for alerts and routing
+    ruleset = get_ruleset()
+    tags = set()
+    for hit in ruleset.matcher.iter_hits(text):
+        if hit.group == "department":
+            tags.add(ruleset.departments[hit.label].tag)
+        elif hit.group == "scan_department":
+            tags.add(hit.label)
+    return sorted(tags)
+
+@lru_cache(maxsize=1)
+def _get_translator():
+    from transformers import pipeline
+    return pipeline("translation", model=TRANSLATION_MODEL)
+
+def translate(text):
+    if not TRANSLATION_MODEL or not text.strip():
+        return text
+    return _get_translator()(text, truncation=True)[0]["translation_text"]
@@ -1,25 +1,29 @@
-from transformers import pipeline
+import sys
 
-# 1️⃣ Load summarization model
-summarizer = pipeline("summarization")
+from backend.app.services.summarizer import get_summarization_service
 
-# 2️⃣ Read the sample document
-with open("sample_document.txt", "r") as f:
-    text = f.read()
+# Alert keywords
+alert_keywords = ["risk", "urgent", "safety", "incident"]
 
-# 3️⃣ Summarize the text
-summary = summarizer(text, max_length=50, min_length=20, do_sample=False)[0]['summary_text']
+def summarize_and_check(path):
+    with open(path, "r") as f:
+        text = f.read()
 
-print("Summary:")
-print(summary)
+    # Long documents are split into model-sized windows and the model is loaded only once per process
+    summary = get_summarization_service().summarize(text)
 
-# 4️⃣ Alert keywords
-alert_keywords = ["risk", "urgent", "safety", "incident"]
+    # Detect alerts in summary
+    alerts = [word for word in alert_keywords if word.lower() in summary.lower()]
+    return summary, alerts
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ["sample_document.txt"]:
+        summary, alerts = summarize_and_check(path)
 
-# 5️⃣ Detect alerts in summary
-alerts = [word for word in alert_keywords if word.lower() in summary.lower()]
+        print(f"Summary of {path}:")
+        print(summary)
 
-if alerts:
-    print("\nALERT! Keywords found:", alerts)
-else:
-    print("\nNo alerts found.")
+        if alerts:
+            print("\nALERT! Keywords found:", alerts)
+        else:
+            print("\nNo alerts found.")